@@ -0,0 +1,117 @@
+import argparse
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+# 10 ms of audio per buffer so the source doesn't add more delay than Opus
+AUDIO_SOURCE = "audiotestsrc is-live=true samplesperbuffer=480"
+
+AUDIO_PT = 100
+OPUS_FRAME_MS = 10
+OPUS_BITRATE = 32000
+# Expected loss the encoder provisions in-band FEC for
+OPUS_EXPECTED_LOSS = 10
+
+AUDIO_RTP_CAPS = (f"application/x-rtp,media=audio,encoding-name=OPUS,"
+                  f"clock-rate=48000,payload={AUDIO_PT}")
+
+
+def audio_description(source=AUDIO_SOURCE):
+    """Launch description of the low-latency Opus send branch.
+
+    `source` is a single source element description. The queue holds at
+    most 20 ms and leaks, Opus runs with 10 ms frames, in-band FEC and DTX
+    (near-zero bitrate while silent). The branch lives in the same pipeline
+    as the cameras, so it shares their clock and the receiver can lip-sync
+    from RTCP sender reports.
+    """
+    return (
+        f'{source} name=asrc ! audioconvert ! audioresample '
+        f'! audio/x-raw,rate=48000,channels=1 '
+        f'! queue name=aqueue leaky=downstream max-size-time={20 * Gst.MSECOND} '
+        f'max-size-buffers=0 max-size-bytes=0 '
+        f'! opusenc name=aenc frame-size={OPUS_FRAME_MS} bitrate={OPUS_BITRATE} '
+        f'audio-type=voice inband-fec=true dtx=true '
+        f'packet-loss-percentage={OPUS_EXPECTED_LOSS} '
+        f'! rtpopuspay name=apay pt={AUDIO_PT} dtx=true'
+    )
+
+
+def make_audio_branch(source=AUDIO_SOURCE):
+    """Parse the audio branch into a bin with a ghosted RTP src pad."""
+    branch = Gst.parse_bin_from_description(audio_description(source), True)
+    branch.set_name("audio")
+    return branch
+
+
+# --- Measurement: added latency and bitrate, with tone and silence ---
+
+def measure(seconds, source):
+    pipe = Gst.Pipeline.new("audiotest")
+    branch = make_audio_branch(source)
+    sink = Gst.ElementFactory.make("fakesink")
+    sink.set_property("sync", False)
+    pipe.add(branch)
+    pipe.add(sink)
+    branch.link(sink)
+
+    stats = {"bytes": 0, "packets": 0, "latency": []}
+
+    def on_buffer(pad, info):
+        buf = info.get_buffer()
+        stats["bytes"] += buf.get_size()
+        stats["packets"] += 1
+        clock = pipe.get_clock()
+        if clock and buf.pts != Gst.CLOCK_TIME_NONE:
+            running = clock.get_time() - pipe.get_base_time()
+            # From the first captured sample of the packet to it being payloaded
+            stats["latency"].append((running - buf.pts) / Gst.MSECOND)
+        return Gst.PadProbeReturn.OK
+
+    sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+    src = branch.get_by_name("asrc")
+    pipe.set_state(Gst.State.PLAYING)
+
+    def run(duration):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            GLib.main_context_default().iteration(False)
+            time.sleep(0.002)
+
+    results = []
+    for phase, volume in (("tone", 1.0), ("silence", 0.0)):
+        if src.find_property("volume"):
+            src.set_property("volume", volume)
+        run(1)  # let DTX/encoder state settle
+        stats.update(bytes=0, packets=0, latency=[])
+        run(seconds / 2)
+        latency = sorted(stats["latency"]) or [0]
+        results.append((phase, stats["bytes"] * 8 / (seconds / 2) / 1000,
+                        stats["packets"] / (seconds / 2),
+                        sum(latency) / len(latency), latency[int(len(latency) * 0.95)]))
+
+    query = Gst.Query.new_latency()
+    reported = None
+    if pipe.query(query):
+        live, min_latency, max_latency = query.parse_latency()
+        reported = min_latency / Gst.MSECOND
+    pipe.set_state(Gst.State.NULL)
+
+    for phase, kbps, pps, mean, p95 in results:
+        print(f"{phase:8s} {kbps:6.1f} kbit/s  {pps:5.1f} packets/s  "
+              f"capture-to-packet latency mean {mean:.1f} ms p95 {p95:.1f} ms")
+    if reported is not None:
+        print(f"Pipeline reported latency: {reported:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure bitrate and added latency of the Opus audio branch")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--source", default=AUDIO_SOURCE,
+                        help="audio source description (default: %(default)s)")
+    args = parser.parse_args()
+    Gst.init(None)
+    measure(args.seconds, args.source)
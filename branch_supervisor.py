@@ -0,0 +1,253 @@
+import argparse
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+# Delays between restart attempts of a failed source, in seconds
+BACKOFF = [0.25, 0.5, 1, 2, 5, 10]
+# A source that keeps running this long after recovering starts over at BACKOFF[0]
+STABLE_SECONDS = 5
+
+PLACEHOLDER_PATTERN = "smpte"
+
+
+def fallback_description(i):
+    return f'input-selector name=fallback{i} sync-streams=false cache-buffers=false'
+
+
+def placeholder_description(i, caps):
+    """Standby test pattern linked into camera i's fallback selector."""
+    return (f'videotestsrc name=placeholder{i} is-live=true pattern={PLACEHOLDER_PATTERN} '
+            f'! capsfilter name=placeholdercaps{i} caps="{caps}" ! fallback{i}.')
+
+
+def drop_eos(pad, info):
+    # A failing source pushes EOS; keep it from ending the track in webrtcbin
+    if info.get_event().type == Gst.EventType.EOS:
+        return Gst.PadProbeReturn.DROP
+    return Gst.PadProbeReturn.OK
+
+
+class Branch:
+    def __init__(self, i, source, capsfilter=None, selector=None, placeholder=None,
+                 live_pad=None, placeholder_pad=None):
+        self.i = i
+        self.source = source
+        self.capsfilter = capsfilter
+        self.selector = selector
+        self.placeholder = placeholder
+        self.live_pad = live_pad
+        self.placeholder_pad = placeholder_pad
+        self.attempt = 0
+        self.failed_at = None
+        self.restart_id = None
+        self.stable_id = None
+        self.recoveries = []
+
+        source.get_static_pad("src").add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, drop_eos)
+        if placeholder:
+            # Stays in NULL, costing nothing, until the camera fails
+            placeholder.set_locked_state(True)
+
+    def owns(self, element):
+        # Only the capture end; a failing encoder or payloader is not fixed
+        # by restarting the source and has to be reported
+        while element is not None:
+            if element is self.source or element is self.capsfilter:
+                return True
+            element = element.get_parent()
+        return False
+
+
+class BranchSupervisor:
+    """Restart a failed camera source without touching the rest of the session.
+
+    Bus errors are mapped to the branch whose source (or a child of it, or
+    its capture capsfilter) posted them; errors from the rest of the branch
+    are left to the caller. That source is locked out of pipeline state
+    changes and set to NULL, then restarted with exponential backoff while
+    the other eye and the peer connection keep running. If the branch has a placeholder, the
+    fallback selector shows it until the camera delivers a buffer again.
+    """
+
+    def __init__(self):
+        self.branches = []
+
+    def add_branch(self, i, source, **kwargs):
+        branch = Branch(i, source, **kwargs)
+        self.branches.append(branch)
+        return branch
+
+    def add_camera_branch(self, i, container):
+        """Supervise a bin built by camera_branch.make_camera_branch."""
+        source = container.get_by_name(f"camsrc{i}")
+        selector = container.get_by_name(f"fallback{i}")
+        placeholder = container.get_by_name(f"placeholder{i}")
+        live_pad = placeholder_pad = None
+        if selector and placeholder:
+            live_pad = container.get_by_name(f"caps{i}").get_static_pad("src").get_peer()
+            placeholder_pad = (container.get_by_name(f"placeholdercaps{i}")
+                               .get_static_pad("src").get_peer())
+        return self.add_branch(i, source, capsfilter=container.get_by_name(f"caps{i}"),
+                               selector=selector, placeholder=placeholder, live_pad=live_pad,
+                               placeholder_pad=placeholder_pad)
+
+    def handle_error(self, message):
+        """Handle a bus ERROR message. Returns False if no branch owns it."""
+        for branch in self.branches:
+            if branch.owns(message.src):
+                err, debug = message.parse_error()
+                print(f"Camera {branch.i} failed: {err.message}")
+                if branch.restart_id is None:
+                    self.isolate(branch)
+                    self.schedule_restart(branch)
+                return True
+        return False
+
+    def isolate(self, branch):
+        if branch.failed_at is None:
+            branch.failed_at = time.monotonic()
+        if branch.stable_id is not None:
+            GLib.source_remove(branch.stable_id)
+            branch.stable_id = None
+        if branch.placeholder:
+            branch.placeholder.set_locked_state(False)
+            branch.placeholder.sync_state_with_parent()
+            branch.selector.set_property("active-pad", branch.placeholder_pad)
+        branch.source.set_locked_state(True)
+        branch.source.set_state(Gst.State.NULL)
+
+    def schedule_restart(self, branch):
+        delay = BACKOFF[min(branch.attempt, len(BACKOFF) - 1)]
+        branch.attempt += 1
+        print(f"Restarting camera {branch.i} in {delay} s (attempt {branch.attempt})")
+        branch.restart_id = GLib.timeout_add(int(delay * 1000), self.restart, branch)
+
+    def restart(self, branch):
+        branch.restart_id = None
+        branch.source.set_locked_state(False)
+        if branch.source.sync_state_with_parent() and \
+                branch.source.get_state(0)[0] != Gst.StateChangeReturn.FAILURE:
+            branch.source.get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, self.on_first_buffer, branch)
+        else:
+            print(f"Camera {branch.i} failed to restart")
+            self.isolate(branch)
+            self.schedule_restart(branch)
+        return GLib.SOURCE_REMOVE
+
+    def on_first_buffer(self, pad, info, branch):
+        GLib.idle_add(self.recovered, branch)
+        return Gst.PadProbeReturn.REMOVE
+
+    def recovered(self, branch):
+        if branch.failed_at is None:
+            return GLib.SOURCE_REMOVE
+        recovery = time.monotonic() - branch.failed_at
+        branch.recoveries.append(recovery)
+        branch.failed_at = None
+        print(f"Camera {branch.i} recovered in {recovery * 1000:.0f} ms")
+        if branch.placeholder:
+            branch.selector.set_property("active-pad", branch.live_pad)
+            branch.placeholder.set_locked_state(True)
+            branch.placeholder.set_state(Gst.State.NULL)
+        branch.stable_id = GLib.timeout_add_seconds(STABLE_SECONDS, self.stable, branch)
+        return GLib.SOURCE_REMOVE
+
+    def stable(self, branch):
+        branch.stable_id = None
+        branch.attempt = 0
+        return GLib.SOURCE_REMOVE
+
+    def stop(self):
+        for branch in self.branches:
+            for source_id in (branch.restart_id, branch.stable_id):
+                if source_id is not None:
+                    GLib.source_remove(source_id)
+            branch.restart_id = branch.stable_id = None
+        self.branches = []
+
+    def stats(self):
+        return {branch.i: list(branch.recoveries) for branch in self.branches}
+
+
+# --- Fault injection: one videotestsrc branch errors out, the other must keep flowing ---
+
+def fault_injection(seconds, error_after):
+    caps = "video/x-raw,format=YUY2,width=640,height=480,framerate=30/1"
+    pipe = Gst.Pipeline.new("faults")
+    supervisor = BranchSupervisor()
+    counts = [0, 0]
+    outage_counts = []
+
+    for i in range(2):
+        inject = f" ! identity error-after={error_after}" if i == 0 else ""
+        source = Gst.parse_bin_from_description(
+            f"videotestsrc is-live=true pattern=ball{inject}", True)
+        source.set_name(f"camsrc{i}")
+        branch = Gst.parse_bin_from_description(
+            f'capsfilter name=caps{i} caps="{caps}" ! {fallback_description(i)} '
+            f'{placeholder_description(i, caps)} '
+            f'fallback{i}. ! videoconvert ! fakesink name=sink{i} sync=false', True)
+        branch.set_name(f"camera{i}")
+        pipe.add(source)
+        pipe.add(branch)
+        source.link(branch)
+
+        def on_buffer(pad, info, i=i):
+            counts[i] += 1
+            return Gst.PadProbeReturn.OK
+
+        branch.get_by_name(f"sink{i}").get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, on_buffer)
+        supervisor.add_branch(
+            i, source, capsfilter=branch.get_by_name(f"caps{i}"),
+            selector=branch.get_by_name(f"fallback{i}"),
+            placeholder=branch.get_by_name(f"placeholder{i}"),
+            live_pad=branch.get_by_name(f"caps{i}").get_static_pad("src").get_peer(),
+            placeholder_pad=branch.get_by_name(f"placeholdercaps{i}")
+            .get_static_pad("src").get_peer())
+
+    def on_bus_message(bus, message):
+        if message.type == Gst.MessageType.ERROR:
+            if supervisor.branches[0].failed_at is None:
+                outage_counts.append(counts[1])
+            if not supervisor.handle_error(message):
+                err, debug = message.parse_error()
+                print(f"Unhandled error: {err.message}")
+        return GLib.SOURCE_CONTINUE
+
+    bus = pipe.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", on_bus_message)
+    pipe.set_state(Gst.State.PLAYING)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        GLib.main_context_default().iteration(False)
+        time.sleep(0.002)
+    pipe.set_state(Gst.State.NULL)
+    bus.remove_signal_watch()
+
+    recoveries = supervisor.stats()[0]
+    supervisor.stop()
+    print(f"Injected failures: {len(outage_counts)}, recoveries: {len(recoveries)}")
+    if recoveries:
+        ms = sorted(r * 1000 for r in recoveries)
+        print(f"Recovery time: min {ms[0]:.0f} ms, median {ms[len(ms) // 2]:.0f} ms, "
+              f"max {ms[-1]:.0f} ms")
+    print(f"Buffers: failing camera {counts[0]}, healthy camera {counts[1]} "
+          f"(expected ~{int(seconds * 30)})")
+    return bool(recoveries) and counts[1] >= seconds * 30 * 0.9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Inject videotestsrc errors into one of two branches and measure recovery")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--error-after", type=int, default=90,
+                        help="buffers before the injected error")
+    args = parser.parse_args()
+    Gst.init(None)
+    raise SystemExit(0 if fault_injection(args.seconds, args.error_after) else 1)
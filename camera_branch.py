@@ -0,0 +1,75 @@
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from live_format import CAPTURE_FORMAT, OUTPUT_FORMAT, format_caps
+from branch_supervisor import fallback_description, placeholder_description
+from simulcast import simulcast_description
+from snapshot import snapshot_description, snapshot_tap
+from stereo_sync import sync_description
+
+TEST_SOURCE = "videotestsrc is-live=true pattern=ball"
+
+
+def camera_source(cam_name):
+    return f'libcamerasrc camera-name="{cam_name}"'
+
+
+def make_camera_branch(i, source, stereo_sync=False, layers=None, placeholder=False,
+                       snapshot=False):
+    """Parse camera i's branch into a bin with a ghosted RTP src pad."""
+    branch = Gst.parse_bin_from_description(
+        camera_description(i, source, stereo_sync=stereo_sync, layers=layers,
+                           placeholder=placeholder, snapshot=snapshot), True)
+    branch.set_name(f"camera{i}")
+    return branch
+
+
+def camera_description(i, source, capture=CAPTURE_FORMAT, output=OUTPUT_FORMAT,
+                       stereo_sync=False, layers=None, placeholder=False, snapshot=False):
+    """Launch description of one camera branch, from source to RTP payloader.
+
+    Parsing the whole branch in one Gst.parse_bin_from_description call is
+    much cheaper at startup than building it element by element from Python.
+    Element names are indexed by camera so LiveFormatController can find them.
+    With simulcast `layers`, the single encoder is replaced by one per layer.
+    `source` is a single source element description; it is named camsrc{i}.
+    With `placeholder`, a standby test pattern can stand in for the camera
+    while BranchSupervisor restarts it. With `snapshot`, the captured frames
+    are also teed to snapsink{i} for the snapshot HTTP server.
+    """
+    capture_caps = format_caps(capture, "YUY2").to_string()
+    output_caps = format_caps(output).to_string()
+    if placeholder:
+        fallback = f'! {fallback_description(i)} '
+        standby = f' {placeholder_description(i, capture_caps)}'
+    else:
+        fallback = standby = ''
+    if snapshot:
+        tap = f'! {snapshot_tap(i)} '
+        standby += f' {snapshot_description(i)}'
+    else:
+        tap = ''
+    # With stereo sync the branch is split into capture and encode halves
+    middle = f'! {sync_description(i)} ' if stereo_sync else ''
+    if layers:
+        encode = f'! {simulcast_description(i, layers, output)}'
+    else:
+        encode = (f'! queue name=queue{i} leaky=downstream max-size-buffers=1 '
+                  f'! vp8enc name=vp8enc{i} deadline=1 ')
+    return (
+        f'{source} name=camsrc{i} ! capsfilter name=caps{i} caps="{capture_caps}" '
+        f'{fallback}{tap}'
+        f'! videoconvert name=conv{i} '
+        f'! videorate name=rate{i} drop-only=true '
+        f'! videoscale name=scale{i} '
+        f'! capsfilter name=outcaps{i} caps="{output_caps}" '
+        f'{middle}{encode}'
+        f'! rtpvp8pay name=pay{i} pt={96 + i} timestamp-offset=0'
+        f'{standby}'
+    )
+
+
+def rtp_caps(i):
+    return Gst.Caps.from_string(
+        f"application/x-rtp,media=video,encoding-name=VP8,clock-rate=90000,payload={96 + i}")
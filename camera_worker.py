@@ -0,0 +1,342 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import Gst, GstVideo, GLib
+
+Gst.init(None)
+
+from live_format import LiveFormatController
+from camera_branch import (TEST_SOURCE, camera_description, camera_source,
+                           make_camera_branch, rtp_caps)
+
+# One shared-memory socket per camera; encoded RTP goes over it, not raw frames
+SHM_SOCKET = "/tmp/webrtcxr-cam{}.sock"
+SHM_SIZE = 4 * 1024 * 1024
+
+# How long start() waits for a worker's socket to appear
+START_TIMEOUT = 10
+
+
+def use_monotonic_clock(pipe):
+    """Make running time equal the system monotonic clock.
+
+    Pipelines in different processes then agree on timestamps, which the
+    benchmark uses to measure latency across the shared-memory hop.
+    """
+    pipe.use_clock(Gst.SystemClock.obtain())
+    pipe.set_start_time(Gst.CLOCK_TIME_NONE)
+    pipe.set_base_time(0)
+
+
+def run_worker(i, source, socket_path, conn, motion_gate=False):
+    """Entry point of a camera worker process: capture + encode into shmsink."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    pipe = Gst.parse_launch(
+        camera_description(i, source)
+        + f' ! shmsink socket-path={socket_path} shm-size={SHM_SIZE}'
+        + ' wait-for-connection=false sync=false')
+    use_monotonic_clock(pipe)
+    # Only camera i lives in this process, so index the controller by i
+    formats = LiveFormatController(pipe, i + 1)
+    if motion_gate:
+        from motion_gate import MotionGate
+        MotionGate().probe(pipe.get_by_name(f"outcaps{i}").get_static_pad("src"))
+    loop = GLib.MainLoop()
+    failed = []
+
+    def on_bus_message(bus, message):
+        if message.type == Gst.MessageType.ERROR:
+            err, debug = message.parse_error()
+            print(f"Camera worker {i} error: {err.message}")
+            failed.append(err)
+            loop.quit()
+        return GLib.SOURCE_CONTINUE
+
+    def on_command(fd, condition):
+        if condition & (GLib.IO_HUP | GLib.IO_ERR):
+            # Parent went away
+            loop.quit()
+            return GLib.SOURCE_REMOVE
+        try:
+            msg = conn.recv()
+        except EOFError:
+            loop.quit()
+            return GLib.SOURCE_REMOVE
+        if msg.get("type") == "stop":
+            loop.quit()
+            return GLib.SOURCE_REMOVE
+        if msg.get("type") == "keyframe":
+            formats.request_keyframe(i)
+            return GLib.SOURCE_CONTINUE
+        msg["camera"] = i
+        formats.handle_message(msg)
+        return GLib.SOURCE_CONTINUE
+
+    bus = pipe.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", on_bus_message)
+    GLib.io_add_watch(conn.fileno(), GLib.PRIORITY_DEFAULT,
+                      GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR, on_command)
+
+    pipe.set_state(Gst.State.PLAYING)
+    print(f"Camera worker {i} running (pid {os.getpid()})")
+    loop.run()
+    pipe.set_state(Gst.State.NULL)
+    bus.remove_signal_watch()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    sys.exit(1 if failed else 0)
+
+
+class CameraWorker:
+    """Main-process handle on one camera worker process."""
+
+    def __init__(self, i, source, motion_gate=False):
+        self.i = i
+        self.source = source
+        self.motion_gate = motion_gate
+        self.socket_path = SHM_SOCKET.format(i)
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=run_worker, args=(self.i, self.source, self.socket_path, child_conn, self.motion_gate),
+            name=f"camera{self.i}", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self, timeout=START_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(self.socket_path):
+                return True
+            if not self.is_alive():
+                return False
+            time.sleep(0.01)
+        return False
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, msg):
+        if self.is_alive():
+            self.conn.send(msg)
+
+    def stop(self):
+        if self.is_alive():
+            try:
+                self.conn.send({"type": "stop"})
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.process = None
+
+
+class CameraWorkerPool:
+    """Run each camera's capture+encode branch in its own process.
+
+    Encoded RTP is handed to the webrtcbin process over shmsink/shmsrc, so the
+    cameras scale across cores and a crashing camera branch can't take the
+    session down with it. Dead workers are restarted by `watch()`.
+    Also accepts the same data channel format commands as LiveFormatController,
+    and forwards the viewer's keyframe requests (PLI/FIR) to the worker's encoder.
+    With `motion_gate`, each worker drops frames of a static scene before
+    encoding (see motion_gate.py).
+    """
+
+    def __init__(self, sources, motion_gate=False):
+        self.workers = [CameraWorker(i, source, motion_gate) for i, source in enumerate(sources)]
+        self.watch_id = None
+
+    def start(self):
+        for worker in self.workers:
+            if not worker.is_alive():
+                worker.start()
+        ready = all(worker.wait_ready() for worker in self.workers)
+        if not ready:
+            print("Some camera workers did not come up")
+        if self.watch_id is None:
+            self.watch_id = GLib.timeout_add_seconds(1, self.watch)
+        return ready
+
+    def watch(self):
+        for worker in self.workers:
+            if worker.process is not None and not worker.is_alive():
+                worker.restarts += 1
+                print(f"Camera worker {worker.i} exited "
+                      f"({worker.process.exitcode}), restarting")
+                worker.start()
+        return GLib.SOURCE_CONTINUE
+
+    def stop(self):
+        if self.watch_id is not None:
+            GLib.source_remove(self.watch_id)
+            self.watch_id = None
+        for worker in self.workers:
+            worker.stop()
+
+    def pids(self):
+        return [worker.process.pid for worker in self.workers if worker.is_alive()]
+
+    def handle_message(self, msg):
+        if msg.get("type") != "set_format":
+            return False
+        camera = msg.get("camera")
+        for worker in self.workers:
+            if camera is None or camera == worker.i:
+                worker.send(dict(msg))
+        return True
+
+    def request_keyframe(self, i):
+        self.workers[i].send({"type": "keyframe"})
+
+
+def make_shm_branch(i, on_keyframe=None):
+    """Create the shmsrc -> capsfilter elements that read camera i's RTP from its worker.
+
+    webrtcbin turns PLI/FIR from the viewer into upstream force-key-unit
+    events, which would end at shmsrc; `on_keyframe(i)` is called on the
+    main loop for each of them so the worker's encoder can be asked instead.
+    """
+    src = Gst.ElementFactory.make("shmsrc", f"shmsrc{i}")
+    src.set_property("socket-path", SHM_SOCKET.format(i))
+    src.set_property("is-live", True)
+    src.set_property("do-timestamp", True)
+    capsfilter = Gst.ElementFactory.make("capsfilter", f"rtpcaps{i}")
+    capsfilter.set_property("caps", rtp_caps(i))
+    if on_keyframe:
+        def forward():
+            on_keyframe(i)
+            return GLib.SOURCE_REMOVE
+
+        def on_event(pad, info):
+            if GstVideo.video_event_is_force_key_unit(info.get_event()):
+                # Streaming thread; the worker pipe belongs to the main loop
+                GLib.idle_add(forward)
+            return Gst.PadProbeReturn.OK
+
+        capsfilter.get_static_pad("src").add_probe(Gst.PadProbeType.EVENT_UPSTREAM, on_event)
+    return [src, capsfilter]
+
+
+# --- Benchmark: single process vs process-per-camera ---
+
+def process_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class LatencyProbe:
+    """Measure capture-to-here latency from RTP timestamps.
+
+    Relies on use_monotonic_clock() and timestamp-offset=0 so that RTP
+    timestamps are the capture time in 90 kHz units.
+    """
+
+    def __init__(self):
+        self.samples = []
+
+    def __call__(self, pad, info):
+        buf = info.get_buffer()
+        rtp_ts = int.from_bytes(buf.extract_dup(4, 4), "big")
+        now = Gst.SystemClock.obtain().get_time() * 90000 // Gst.SECOND
+        self.samples.append(((now - rtp_ts) % (1 << 32)) / 90.0)
+        return Gst.PadProbeReturn.OK
+
+    def summary(self):
+        if not self.samples:
+            return "no samples"
+        samples = sorted(self.samples)
+        mean = sum(samples) / len(samples)
+        p95 = samples[int(len(samples) * 0.95)]
+        return f"mean {mean:.1f} ms, p95 {p95:.1f} ms, {len(samples)} packets"
+
+
+def benchmark(mode, sources, seconds):
+    pipe = Gst.Pipeline.new("bench")
+    use_monotonic_clock(pipe)
+    pool = None
+    if mode == "process":
+        pool = CameraWorkerPool(sources)
+        pool.start()
+    probes = []
+    for i, source in enumerate(sources):
+        if pool:
+            elements = make_shm_branch(i)
+            for e in elements:
+                pipe.add(e)
+            elements[0].link(elements[1])
+            last = elements[1]
+        else:
+            branch = make_camera_branch(i, source)
+            pipe.add(branch)
+            last = branch
+        sink = Gst.ElementFactory.make("fakesink", f"sink{i}")
+        sink.set_property("sync", False)
+        pipe.add(sink)
+        last.link(sink)
+        probe = LatencyProbe()
+        sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, probe)
+        probes.append(probe)
+
+    pipe.set_state(Gst.State.PLAYING)
+    # Let encoders settle before measuring
+    warmup = time.monotonic() + 2
+    while time.monotonic() < warmup:
+        GLib.main_context_default().iteration(False)
+        time.sleep(0.005)
+    for probe in probes:
+        probe.samples.clear()
+    pids = [os.getpid()] + (pool.pids() if pool else [])
+    cpu_start = [process_cpu_seconds(pid) for pid in pids]
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        GLib.main_context_default().iteration(False)
+        time.sleep(0.005)
+    elapsed = time.monotonic() - start
+    cpu = [(process_cpu_seconds(pid) - c) / elapsed * 100 for pid, c in zip(pids, cpu_start)]
+    pipe.set_state(Gst.State.NULL)
+    if pool:
+        pool.stop()
+
+    print(f"== {mode} ==")
+    names = ["main"] + [f"camera{i}" for i in range(len(pids) - 1)]
+    for name, pct in zip(names, cpu):
+        print(f"  {name:8s} CPU {pct:6.1f}%")
+    print(f"  total    CPU {sum(cpu):6.1f}%")
+    for i, probe in enumerate(probes):
+        print(f"  camera{i} latency: {probe.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare CPU distribution and latency of the single-process "
+                    "and process-per-camera layouts")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--libcamera", nargs="*", metavar="CAMERA_NAME",
+                        help="capture from these libcamera cameras instead of videotestsrc")
+    args = parser.parse_args()
+
+    if args.libcamera:
+        sources = [camera_source(name) for name in args.libcamera]
+    else:
+        sources = [TEST_SOURCE] * args.cameras
+    benchmark("single", sources, args.seconds)
+    benchmark("process", sources, args.seconds)
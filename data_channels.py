@@ -0,0 +1,275 @@
+import argparse
+import json
+import subprocess
+import threading
+import time
+from collections import deque
+
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstWebRTC', '1.0')
+from gi.repository import Gst, GstWebRTC, GLib
+
+# Data channels negotiated by the robot, with their delivery options.
+# Pose is unordered and never retransmitted so one lost packet can't delay
+# later poses; only the newest pose is handed to the callback.
+CHANNELS = {
+    "pose": {"ordered": False, "max-retransmits": 0, "priority": "high", "latest_only": True},
+    "control": {"ordered": True, "priority": "medium"},
+    "telemetry": {"ordered": True, "priority": "very-low"},
+}
+
+
+def channel_options(spec):
+    """Options structure for webrtcbin's create-data-channel."""
+    fields = [f"ordered=(boolean){'true' if spec.get('ordered', True) else 'false'}"]
+    if "max-retransmits" in spec:
+        fields.append(f"max-retransmits=(int){spec['max-retransmits']}")
+    if "max-packet-lifetime" in spec:
+        fields.append(f"max-packet-lifetime=(int){spec['max-packet-lifetime']}")
+    if "priority" in spec:
+        fields.append(f"priority=(GstWebRTCPriorityType){spec['priority']}")
+    return Gst.Structure.new_from_string("options, " + ", ".join(fields))
+
+
+class Dispatcher:
+    """Run a channel's callback on its own thread, off the GLib/SCTP threads.
+
+    With latest_only, messages that arrive while the callback is busy are
+    replaced by newer ones instead of queueing up behind it. Messages for
+    which keep(message) is true (e.g. pose keyframes that later deltas
+    refer to) are only replaced by the next such message.
+    """
+
+    def __init__(self, label, callback, latest_only=False, keep=None):
+        self.label = label
+        self.callback = callback
+        self.latest_only = latest_only
+        self.keep = keep
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.superseded = 0
+        self.thread = threading.Thread(target=self.run, name=f"dc-{label}", daemon=True)
+        self.thread.start()
+
+    def put(self, channel, message):
+        with self.cond:
+            if self.latest_only:
+                if self.keep and self.keep(message):
+                    self.superseded += len(self.items)
+                    self.items.clear()
+                while self.items and not (self.keep and self.keep(self.items[-1][1])):
+                    self.items.pop()
+                    self.superseded += 1
+            self.items.append((channel, message))
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.items and not self.stopped:
+                    self.cond.wait()
+                if self.stopped:
+                    return
+                channel, message = self.items.popleft()
+            try:
+                self.callback(channel, message)
+            except Exception as e:
+                print(f"Error in {self.label} data channel handler: {e}")
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join(1)
+
+
+class ChannelManager:
+    """Create the per-purpose data channels and dispatch their messages.
+
+    Register handlers with on(label, callback, keep=None); callbacks get
+    (channel, message) where message is a str, or bytes for binary messages.
+    Channels opened by the remote peer are routed the same way by label,
+    falling back to the "control" handler.
+    """
+
+    def __init__(self, webrtc, specs=CHANNELS):
+        self.webrtc = webrtc
+        self.specs = specs
+        self.channels = {}
+        self.handlers = {}
+        self.keep = {}
+        self.dispatchers = {}
+
+    def on(self, label, callback, keep=None):
+        self.handlers[label] = callback
+        self.keep[label] = keep
+
+    def create(self):
+        for label, spec in self.specs.items():
+            channel = self.webrtc.emit("create-data-channel", label, channel_options(spec))
+            if channel:
+                print(f"Data channel {label} created on robot")
+                self.adopt(channel)
+            else:
+                print(f"Failed to create data channel {label}")
+
+    def adopt(self, channel):
+        label = channel.props.label
+        self.channels[label] = channel
+        if label not in self.dispatchers:
+            callback = self.handlers.get(label) or self.handlers.get("control")
+            if callback is None:
+                return
+            latest_only = self.specs.get(label, {}).get("latest_only", False)
+            self.dispatchers[label] = Dispatcher(label, callback, latest_only,
+                                                 self.keep.get(label))
+        dispatcher = self.dispatchers[label]
+        channel.connect("on-message-string", lambda ch, msg: dispatcher.put(ch, msg))
+        channel.connect("on-message-data",
+                        lambda ch, data: dispatcher.put(ch, data.get_data() if data else b""))
+
+    def send(self, label, text):
+        channel = self.channels.get(label)
+        if channel is None or channel.props.ready_state != GstWebRTC.WebRTCDataChannelState.OPEN:
+            return False
+        channel.emit("send-string", text)
+        return True
+
+    def close(self):
+        for dispatcher in self.dispatchers.values():
+            dispatcher.stop()
+        for channel in self.channels.values():
+            channel.emit("close")
+        self.dispatchers = {}
+        self.channels = {}
+
+
+# --- Loopback benchmark: pose vs reliable channel latency under loss ---
+
+# With --loss, pose p95 may rise by at most this much over the lossless run
+POSE_P95_TOLERANCE_MS = 5
+
+
+class Latencies:
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def __call__(self, channel, message):
+        sent = json.loads(message)["t"]
+        with self.lock:
+            self.samples.append((time.monotonic() - sent) * 1000)
+
+    def reset(self):
+        with self.lock:
+            self.samples = []
+
+    def percentile(self, q):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def summary(self):
+        with self.lock:
+            count, top = len(self.samples), max(self.samples, default=0)
+        if not count:
+            return "no messages"
+        return (f"{count:5d} msgs  p50 {self.percentile(0.5):6.1f}  "
+                f"p95 {self.percentile(0.95):6.1f}  p99 {self.percentile(0.99):6.1f}  "
+                f"max {top:6.1f} ms")
+
+
+def set_loopback_loss(percent):
+    """Apply (or with None, remove) netem packet loss on lo. Needs root."""
+    if percent is None:
+        subprocess.run(["tc", "qdisc", "del", "dev", "lo", "root", "netem"], check=False)
+    else:
+        subprocess.run(["tc", "qdisc", "add", "dev", "lo", "root", "netem",
+                        "loss", f"{percent}%"], check=True)
+
+
+def send_for(pair, sender, results, seconds, rate, label):
+    """Send pose and control messages for `seconds` and print their latencies."""
+    for latencies in results.values():
+        latencies.reset()
+    seq = [0]
+
+    def tick():
+        seq[0] += 1
+        message = json.dumps({"seq": seq[0], "t": time.monotonic()})
+        sender.send("pose", message)
+        sender.send("control", message)
+        return GLib.SOURCE_CONTINUE
+
+    source = GLib.timeout_add(int(1000 / rate), tick)
+    pair.run(seconds)
+    GLib.source_remove(source)
+    pair.run(1)  # let retransmissions drain
+    print(label)
+    for name, latencies in results.items():
+        print(f"  {name:8s} {latencies.summary()}")
+    return results["pose"].percentile(0.95)
+
+
+def loopback_benchmark(seconds, rate, loss):
+    """Print channel latencies; with `loss`, return False if pose p95 rose under it."""
+    from loopback import LoopbackPair
+
+    pair = LoopbackPair()
+    sender = ChannelManager(pair.offerer)
+    receiver = ChannelManager(pair.answerer)
+    results = {label: Latencies() for label in ("pose", "control")}
+    for label, callback in results.items():
+        receiver.on(label, callback)
+    receiver.on("telemetry", lambda channel, message: None)
+    pair.answerer.connect("on-data-channel", lambda webrtc, channel: receiver.adopt(channel))
+    sender.create()
+    pair.start()
+
+    if not pair.run(10, until=lambda: all(
+            ch.props.ready_state == GstWebRTC.WebRTCDataChannelState.OPEN
+            for ch in sender.channels.values())):
+        print("Data channels did not open")
+        pair.stop()
+        return False
+    print(f"Connected in {pair.time_to_connected() or 0:.3f} s")
+
+    ok = True
+    clean = send_for(pair, sender, results, seconds, rate, "No loss")
+    if loss:
+        set_loopback_loss(loss)
+        try:
+            lossy = send_for(pair, sender, results, seconds, rate, f"{loss}% loss")
+        finally:
+            set_loopback_loss(None)
+        if clean is None or lossy is None:
+            print("FAIL: no pose messages arrived")
+            ok = False
+        elif lossy - clean > POSE_P95_TOLERANCE_MS:
+            print(f"FAIL: pose p95 rose {lossy - clean:.1f} ms under loss "
+                  f"(allowed {POSE_P95_TOLERANCE_MS} ms)")
+            ok = False
+        else:
+            print(f"PASS: pose p95 {clean:.1f} ms without loss, {lossy:.1f} ms with")
+    sender.close()
+    receiver.close()
+    pair.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare pose and control channel latency over a loopback peer")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=float, default=90, help="messages per second")
+    parser.add_argument("--loss", type=float, default=0,
+                        help="packet loss %% to apply on lo with tc netem (needs root)")
+    args = parser.parse_args()
+    Gst.init(None)
+    ok = loopback_benchmark(args.seconds, args.rate, args.loss)
+    raise SystemExit(0 if ok else 1)
@@ -13,6 +13,10 @@ from gi.repository import Gst, GstWebRTC, GstSdp, GLib
 
 Gst.init(None)
 
+from live_format import LiveFormatController, format_caps, make_format_stage
+from branch_supervisor import BranchSupervisor
+from data_channels import CHANNELS, ChannelManager
+
 # WebSocket configuration
 HOST_URL= "ws://10.33.12.42:8766"
 PIPELINE_DESC = '''
@@ -24,6 +28,9 @@ VIDEO_SOURCES = [
     "/base/axi/pcie@1000120000/rp1/i2c@88000/ov5647@36"
 ]
 
+# Capture size is left to the sensor; switch it live through self.formats
+VIDEO_FORMAT = {"width": None, "height": None, "framerate": 30}
+
 async def glib_main_loop_iteration():
     while True:
         while GLib.main_context_default().iteration(False):
@@ -39,6 +46,9 @@ class WebRTCClient:
         self.added_data_channel = False
         self.connection_state = "new"
         self.cleanup_timeout = None
+        self.formats = None
+        self.supervisor = None
+        self.channels = None
 
     def reset_state(self):
         """Reset all connection-related state"""
@@ -71,7 +81,14 @@ class WebRTCClient:
         self.webrtc.connect("on-ice-candidate", self.send_ice_candidate_message)
         self.webrtc.connect("on-negotiation-needed", self.on_negotiation_needed)
         self.webrtc.connect("on-connection-state-changed", self.on_connection_state_changed)
+        self.webrtc.connect("on-data-channel", self.on_data_channel)
+
+        # Only a control channel here, for set_format commands
+        self.channels = ChannelManager(self.webrtc, {"control": CHANNELS["control"]})
+        self.channels.on("control", self.on_control_message)
         
+        self.supervisor = BranchSupervisor()
+
         # Add video sources dynamically
         for i in range(0, 2):
             cam_name = VIDEO_SOURCES[i]
@@ -79,11 +96,12 @@ class WebRTCClient:
             src.set_property("camera-name", cam_name)
             print(f"Camera {i} name:", src.get_property("camera-name"))
             
-            caps = Gst.Caps.from_string("video/x-raw,format=YUY2, framerate=30/1")
+            caps = format_caps(VIDEO_FORMAT, "YUY2")
             capsfilter = Gst.ElementFactory.make("capsfilter", f"caps{i}")
             capsfilter.set_property("caps", caps)
             
             conv = Gst.ElementFactory.make("videoconvert", f"conv{i}")
+            rate, scale, outcaps = make_format_stage(i, VIDEO_FORMAT)
             queue = Gst.ElementFactory.make("queue", f"queue{i}")
             queue.set_property("leaky", 1)
             queue.set_property("max-size-buffers", 1)
@@ -97,16 +115,20 @@ class WebRTCClient:
             pay.set_property("pt", 96+i)
             
             # Add all elements to pipeline
-            elements = [src, capsfilter, conv, queue, vp8enc, pay]
+            elements = [src, capsfilter, conv, rate, scale, outcaps, queue, vp8enc, pay]
             for element in elements:
                 self.pipe.add(element)
             
             # Link elements
             src.link(capsfilter)
             capsfilter.link(conv)
-            conv.link(queue)
+            conv.link(rate)
+            rate.link(scale)
+            scale.link(outcaps)
+            outcaps.link(queue)
             queue.link(vp8enc)
             vp8enc.link(pay)
+            self.supervisor.add_branch(i, src)
             
             # Add transceiver
             caps = pay.get_static_pad("src").get_current_caps()
@@ -125,6 +147,9 @@ class WebRTCClient:
             else:
                 print(f"Failed to get sink pad for stream {i}")
 
+        self.formats = LiveFormatController(self.pipe, len(VIDEO_SOURCES), VIDEO_FORMAT,
+                                            VIDEO_FORMAT, capture_pixel_format="YUY2")
+
         print("Setting pipeline to PLAYING state")
         ret = self.pipe.set_state(Gst.State.PLAYING)
         if ret == Gst.StateChangeReturn.FAILURE:
@@ -174,6 +199,8 @@ class WebRTCClient:
             print("Recalculating latency")
             self.pipe.recalculate_latency()
         elif t == Gst.MessageType.ERROR:
+            if self.supervisor and self.supervisor.handle_error(message):
+                return GLib.SOURCE_CONTINUE
             err, debug = message.parse_error()
             print(f"Pipeline error: {err.message}")
             print(f"Debug info: {debug}")
@@ -191,6 +218,9 @@ class WebRTCClient:
         """Properly close and cleanup the pipeline"""
         if self.pipe:
             print("Closing pipeline")
+            if self.channels:
+                self.channels.close()
+                self.channels = None
             # Stop the pipeline gracefully
             self.pipe.set_state(Gst.State.NULL)
             
@@ -207,6 +237,10 @@ class WebRTCClient:
             
             self.pipe = None
             self.webrtc = None
+            self.formats = None
+            if self.supervisor:
+                self.supervisor.stop()
+                self.supervisor = None
 
     def on_negotiation_needed(self, element):
         print("Negotiation needed")
@@ -215,9 +249,23 @@ class WebRTCClient:
             return
         
         self.added_data_channel = True
+        self.channels.create()
         promise = Gst.Promise.new_with_change_func(self.on_offer_created, element, None)
         self.webrtc.emit("create-offer", None, promise)
 
+    def on_data_channel(self, webrtc, channel):
+        print("New data channel:", channel.props.label)
+        self.channels.adopt(channel)
+
+    def on_control_message(self, channel, message):
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            print("Ignoring non-JSON control message")
+            return
+        if isinstance(msg, dict) and not (self.formats and self.formats.handle_message(msg)):
+            print(f"Unhandled control message: {msg.get('type', 'unknown')}")
+
     def on_offer_created(self, promise, _, __):
         print("Offer created")
         promise.wait()
@@ -286,6 +334,10 @@ class WebRTCClient:
                 ice = msg['ice']
                 print(f"Adding ICE candidate: {ice['candidate']}")
                 self.webrtc.emit("add-ice-candidate", ice['sdpMLineIndex'], ice['candidate'])
+
+            elif self.formats and self.formats.handle_message(msg):
+                # set_format relayed over signaling, same as on the control channel
+                pass
                 
         except json.JSONDecodeError as e:
             print(f"Failed to parse JSON message: {e}")
@@ -0,0 +1,195 @@
+import threading
+
+import numpy as np
+
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import Gst, GstVideo
+
+# Hardware decoders preferred over software ones by decodebin, if present
+HW_DECODERS = [
+    "v4l2slvp8dec", "v4l2vp8dec", "v4l2slh264dec", "v4l2h264dec",
+    "v4l2slvp9dec", "v4l2vp9dec", "vah264dec", "vavp8dec", "vavp9dec",
+]
+
+AUDIO_RATE = 48000
+AUDIO_CHANNELS = 1
+AUDIO_SECONDS = 2
+
+
+def prefer_hardware_decoders(names=HW_DECODERS):
+    """Raise the rank of available hardware decoders so decodebin picks them."""
+    registry = Gst.Registry.get()
+    found = []
+    for name in names:
+        feature = registry.lookup_feature(name)
+        if feature:
+            feature.set_rank(Gst.Rank.PRIMARY + 1)
+            found.append(name)
+    if found:
+        print("Preferring hardware decoders:", ", ".join(found))
+    return found
+
+
+class Frame:
+    """A decoded video frame mapped for reading.
+
+    `data` and the arrays from `plane()` are views over the mapped GstBuffer
+    (no copy with gst-python's buffer map override), so release() the frame,
+    or use it as a context manager, once done with them.
+    """
+
+    def __init__(self, sample):
+        self.buffer = sample.get_buffer()
+        self.info = GstVideo.VideoInfo.new_from_caps(sample.get_caps())
+        self.width = self.info.width
+        self.height = self.info.height
+        self.format = self.info.finfo.name
+        self.pts = self.buffer.pts
+        ok, self.map = self.buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            raise RuntimeError("Failed to map video buffer")
+        self.data = np.frombuffer(self.map.data, dtype=np.uint8)
+
+    def plane(self, k):
+        """2-D (rows, stride) uint8 view of plane k (e.g. Y, U, V for I420)."""
+        n_planes = self.info.finfo.n_planes
+        offset = self.info.offset[k]
+        stride = self.info.stride[k]
+        end = self.info.offset[k + 1] if k + 1 < n_planes else self.info.size
+        rows = (end - offset) // stride
+        return self.data[offset:offset + rows * stride].reshape(rows, stride)
+
+    def release(self):
+        if self.map is not None:
+            self.data = None
+            self.buffer.unmap(self.map)
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class LatestVideo:
+    """Keep only the most recent decoded frame of an incoming video stream.
+
+    The appsink holds one sample and drops older ones without calling into
+    Python, so frames nobody asks for cost nothing beyond the decode.
+    """
+
+    def __init__(self, appsink):
+        self.appsink = appsink
+        self.sample = None
+
+    def latest(self):
+        """Return the newest Frame, or None if nothing was decoded yet."""
+        sample = self.appsink.emit("try-pull-sample", 0)
+        if sample is not None:
+            self.sample = sample
+        if self.sample is None:
+            return None
+        return Frame(self.sample)
+
+
+class AudioRing:
+    """Ring buffer of the most recent incoming audio as int16 samples."""
+
+    def __init__(self, seconds=AUDIO_SECONDS, rate=AUDIO_RATE, channels=AUDIO_CHANNELS):
+        self.rate = rate
+        self.channels = channels
+        self.ring = np.zeros((seconds * rate, channels), dtype=np.int16)
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def write(self, samples):
+        n = len(samples)
+        size = len(self.ring)
+        if n >= size:
+            samples = samples[-size:]
+            n = size
+        with self.lock:
+            start = self.written % size
+            first = min(n, size - start)
+            self.ring[start:start + first] = samples[:first]
+            self.ring[:n - first] = samples[first:]
+            self.written += n
+
+    def read(self, n):
+        """Copy of the newest n frames (fewer if not enough audio arrived yet)."""
+        size = len(self.ring)
+        with self.lock:
+            n = min(n, size, self.written)
+            end = self.written % size
+            idx = np.arange(end - n, end) % size
+            return self.ring[idx]
+
+    def on_new_sample(self, appsink):
+        sample = appsink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buf = sample.get_buffer()
+        ok, info = buf.map(Gst.MapFlags.READ)
+        if ok:
+            samples = np.frombuffer(info.data, dtype=np.int16).reshape(-1, self.channels)
+            self.write(samples)
+            buf.unmap(info)
+        return Gst.FlowReturn.OK
+
+
+class InboundMedia:
+    """Route decoded operator video/audio into appsinks for robot-side code.
+
+    Video is left at its native decoded resolution and format; audio is
+    converted to int16 at AUDIO_RATE into an AudioRing.
+    """
+
+    def __init__(self):
+        self.videos = []
+        self.audio = AudioRing()
+
+    def attach_video(self, pipe, pad):
+        q = Gst.ElementFactory.make("queue")
+        q.set_property("leaky", 2)
+        q.set_property("max-size-buffers", 1)
+        sink = Gst.ElementFactory.make("appsink")
+        sink.set_property("sync", False)
+        sink.set_property("max-buffers", 1)
+        sink.set_property("drop", True)
+        for e in [q, sink]:
+            pipe.add(e)
+            e.sync_state_with_parent()
+        pad.link(q.get_static_pad("sink"))
+        q.link(sink)
+        self.videos.append(LatestVideo(sink))
+        return [q, sink]
+
+    def attach_audio(self, pipe, pad):
+        q = Gst.ElementFactory.make("queue")
+        conv = Gst.ElementFactory.make("audioconvert")
+        resample = Gst.ElementFactory.make("audioresample")
+        capsfilter = Gst.ElementFactory.make("capsfilter")
+        capsfilter.set_property("caps", Gst.Caps.from_string(
+            f"audio/x-raw,format=S16LE,layout=interleaved,"
+            f"rate={AUDIO_RATE},channels={AUDIO_CHANNELS}"))
+        sink = Gst.ElementFactory.make("appsink")
+        sink.set_property("sync", False)
+        sink.set_property("emit-signals", True)
+        sink.connect("new-sample", self.audio.on_new_sample)
+        elements = [q, conv, resample, capsfilter, sink]
+        for e in elements:
+            pipe.add(e)
+            e.sync_state_with_parent()
+        pad.link(q.get_static_pad("sink"))
+        for a, b in zip(elements, elements[1:]):
+            a.link(b)
+        return elements
+
+    def latest_frame(self, index=0):
+        """Newest Frame of incoming video stream `index`, or None."""
+        if index >= len(self.videos):
+            return None
+        return self.videos[index].latest()
@@ -0,0 +1,177 @@
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import Gst, GstVideo
+
+# Default capture and output formats for each camera branch
+CAPTURE_FORMAT = {"width": 640, "height": 480, "framerate": 30}
+OUTPUT_FORMAT = {"width": 640, "height": 480, "framerate": 30}
+
+
+def format_caps(fmt, pixel_format=None):
+    """Build raw video caps from a {width, height, framerate} dict."""
+    fields = ["video/x-raw"]
+    if pixel_format:
+        fields.append(f"format={pixel_format}")
+    if fmt.get("width"):
+        fields.append(f"width={fmt['width']}")
+    if fmt.get("height"):
+        fields.append(f"height={fmt['height']}")
+    if fmt.get("framerate"):
+        fields.append(f"framerate={fmt['framerate']}/1")
+    return Gst.Caps.from_string(",".join(fields))
+
+
+def scaled_format(fmt, scale):
+    """Format with width/height divided by `scale` (kept even for the encoder)."""
+    scaled = dict(fmt)
+    for key in ("width", "height"):
+        if fmt.get(key):
+            scaled[key] = max(2, fmt[key] // scale // 2 * 2)
+    return scaled
+
+
+def make_format_stage(i, fmt=OUTPUT_FORMAT):
+    """Create the videorate -> videoscale -> capsfilter stage for camera i.
+
+    The stage sits between videoconvert and the encoder queue. Changing the
+    capsfilter caps at runtime renegotiates only the scaler/rate elements;
+    the encoder restarts on a keyframe while the RTP caps stay the same, so
+    no SDP renegotiation is needed.
+    """
+    rate = Gst.ElementFactory.make("videorate", f"rate{i}")
+    # Only ever drop frames, never duplicate them (duplicates add latency)
+    rate.set_property("drop-only", True)
+    scale = Gst.ElementFactory.make("videoscale", f"scale{i}")
+    outcaps = Gst.ElementFactory.make("capsfilter", f"outcaps{i}")
+    outcaps.set_property("caps", format_caps(fmt))
+    return [rate, scale, outcaps]
+
+
+def is_int(value):
+    # JSON true/false arrive as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def request_keyframe(enc):
+    """Send a force-key-unit event upstream into encoder `enc`."""
+    event = GstVideo.video_event_new_upstream_force_key_unit(
+        Gst.CLOCK_TIME_NONE, True, 0)
+    enc.get_static_pad("src").send_event(event)
+
+
+class LiveFormatController:
+    """Switch capture/output resolution and framerate of running camera branches.
+
+    Usable directly (e.g. from an adaptive bitrate controller) or through
+    data channel commands of the form:
+
+        {"type": "set_format", "target": "output", "camera": 0,
+         "width": 320, "height": 240, "framerate": 15}
+
+    "target" defaults to "output" and "camera" defaults to every camera so
+    both eyes stay matched. With simulcast `layers`, every layer is rescaled
+    relative to the new output format.
+    """
+
+    def __init__(self, pipe, num_cameras, capture_format=CAPTURE_FORMAT,
+                 output_format=OUTPUT_FORMAT, capture_pixel_format=None, layers=None):
+        self.pipe = pipe
+        self.num_cameras = num_cameras
+        self.capture_pixel_format = capture_pixel_format
+        self.layers = layers or []
+        self.capture = [dict(capture_format) for _ in range(num_cameras)]
+        self.output = [dict(output_format) for _ in range(num_cameras)]
+
+    def _cameras(self, index):
+        if index is None:
+            return range(self.num_cameras)
+        return [index]
+
+    def _update(self, formats, index, width, height, framerate):
+        changed = []
+        for i in self._cameras(index):
+            fmt = formats[i]
+            new = {
+                "width": width or fmt["width"],
+                "height": height or fmt["height"],
+                "framerate": framerate or fmt["framerate"],
+            }
+            if new != fmt:
+                formats[i] = new
+                changed.append(i)
+        return changed
+
+    def set_output_format(self, index=None, width=None, height=None, framerate=None):
+        """Change the encoded resolution/framerate. Takes effect on the next frame."""
+        if framerate:
+            # videorate only drops frames, so the output can't exceed capture rate
+            cams = self._cameras(index)
+            framerate = min([framerate] + [self.capture[i]["framerate"] for i in cams])
+        changed = self._update(self.output, index, width, height, framerate)
+        for i in changed:
+            outcaps = self.pipe.get_by_name(f"outcaps{i}")
+            if not outcaps:
+                print(f"No output capsfilter for camera {i}")
+                continue
+            outcaps.set_property("caps", format_caps(self.output[i]))
+            for layer in self.layers:
+                layercaps = self.pipe.get_by_name(f"layercaps{i}_{layer['rid']}")
+                layer_fmt = scaled_format(self.output[i], layer["scale"])
+                layercaps.set_property("caps", format_caps(layer_fmt))
+            self.request_keyframe(i)
+            print(f"Camera {i} output format -> {self.output[i]}")
+        return changed
+
+    def set_capture_format(self, index=None, width=None, height=None, framerate=None):
+        """Change the sensor capture format.
+
+        This makes the source renegotiate, which on libcamerasrc restarts the
+        sensor stream, so prefer set_output_format for fast switches.
+        """
+        changed = self._update(self.capture, index, width, height, framerate)
+        for i in changed:
+            caps = self.pipe.get_by_name(f"caps{i}")
+            if not caps:
+                print(f"No capture capsfilter for camera {i}")
+                continue
+            caps.set_property("caps", format_caps(self.capture[i], self.capture_pixel_format))
+            print(f"Camera {i} capture format -> {self.capture[i]}")
+            # Keep the output framerate within what is captured
+            if self.output[i]["framerate"] > self.capture[i]["framerate"]:
+                self.set_output_format(i, framerate=self.capture[i]["framerate"])
+        return changed
+
+    def request_keyframe(self, i):
+        """Ask the encoder(s) of camera i for a keyframe so the switch is clean."""
+        if self.layers:
+            names = [f"vp8enc{i}_{layer['rid']}" for layer in self.layers]
+        else:
+            names = [f"vp8enc{i}"]
+        for name in names:
+            enc = self.pipe.get_by_name(name)
+            if enc:
+                request_keyframe(enc)
+
+    def handle_message(self, msg):
+        """Apply a "set_format" data channel command. Returns True if handled.
+
+        Malformed commands are rejected (and count as handled) rather than
+        turned into caps that fail to parse.
+        """
+        if msg.get("type") != "set_format":
+            return False
+        camera = msg.get("camera")
+        if camera is not None and not (is_int(camera) and 0 <= camera < self.num_cameras):
+            print(f"Rejected set_format: no camera {camera!r}")
+            return True
+        for key in ("width", "height", "framerate"):
+            if msg.get(key) is not None and not (is_int(msg[key]) and msg[key] > 0):
+                print(f"Rejected set_format: {key} must be a positive integer, got {msg[key]!r}")
+                return True
+        args = (camera, msg.get("width"), msg.get("height"), msg.get("framerate"))
+        if msg.get("target", "output") == "capture":
+            self.set_capture_format(*args)
+        else:
+            self.set_output_format(*args)
+        return True
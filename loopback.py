@@ -0,0 +1,105 @@
+import threading
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstWebRTC', '1.0')
+from gi.repository import Gst, GstWebRTC, GLib
+
+
+class LoopbackPair:
+    """Two webrtcbins in one pipeline that negotiate with each other directly.
+
+    Offer/answer and ICE candidates are handed across in-process, so the
+    connection runs over the host's loopback interface. Used by the data
+    channel and ICE benchmarks in place of a browser peer.
+
+    With `pregather`, the offer and the offerer's candidates are held back
+    until deliver() is called, like a robot waiting for the viewer's HELLO;
+    time_to_connected() then counts from deliver().
+    """
+
+    def __init__(self, offerer_desc="webrtcbin name=offerer bundle-policy=max-bundle",
+                 answerer_desc="webrtcbin name=answerer bundle-policy=max-bundle",
+                 pregather=False):
+        self.pipe = Gst.Pipeline.new("loopback")
+        self.offerer = Gst.parse_launch(offerer_desc)
+        self.answerer = Gst.parse_launch(answerer_desc)
+        self.pipe.add(self.offerer)
+        self.pipe.add(self.answerer)
+        self.started = None
+        self.connected = None
+        self.held = [] if pregather else None
+        self.offer = None
+        self.lock = threading.Lock()
+
+        self.offerer.connect("on-negotiation-needed", self.on_negotiation_needed)
+        self.offerer.connect("on-ice-candidate", self.on_ice_candidate, self.answerer)
+        self.answerer.connect("on-ice-candidate", self.on_ice_candidate, self.offerer)
+        self.offerer.connect("notify::connection-state", self.on_connection_state)
+
+    def start(self):
+        self.started = time.monotonic()
+        self.pipe.set_state(Gst.State.PLAYING)
+
+    def stop(self):
+        self.pipe.set_state(Gst.State.NULL)
+
+    def on_negotiation_needed(self, element):
+        promise = Gst.Promise.new_with_change_func(self.on_offer_created, None)
+        self.offerer.emit("create-offer", None, promise)
+
+    def on_offer_created(self, promise, _):
+        offer = promise.get_reply().get_value("offer")
+        self.offer = offer
+        self.offerer.emit("set-local-description", offer, Gst.Promise.new())
+        with self.lock:
+            held = self.held is not None
+        if not held:
+            self.answer(offer)
+
+    def answer(self, offer):
+        self.answerer.emit("set-remote-description", offer, Gst.Promise.new())
+        promise = Gst.Promise.new_with_change_func(self.on_answer_created, None)
+        self.answerer.emit("create-answer", None, promise)
+
+    def deliver(self):
+        """Hand the held offer and candidates to the answerer."""
+        with self.lock:
+            candidates, self.held = self.held, None
+        self.started = time.monotonic()
+        self.answer(self.offer)
+        for mlineindex, candidate in candidates:
+            self.answerer.emit("add-ice-candidate", mlineindex, candidate)
+
+    def on_answer_created(self, promise, _):
+        answer = promise.get_reply().get_value("answer")
+        self.answerer.emit("set-local-description", answer, Gst.Promise.new())
+        self.offerer.emit("set-remote-description", answer, Gst.Promise.new())
+
+    def on_ice_candidate(self, element, mlineindex, candidate, other):
+        with self.lock:
+            if element is self.offerer and self.held is not None:
+                self.held.append((mlineindex, candidate))
+                return
+        other.emit("add-ice-candidate", mlineindex, candidate)
+
+    def on_connection_state(self, element, pspec):
+        state = element.get_property("connection-state")
+        if state == GstWebRTC.WebRTCPeerConnectionState.CONNECTED and self.connected is None:
+            self.connected = time.monotonic()
+
+    def time_to_connected(self):
+        if self.connected is None:
+            return None
+        return self.connected - self.started
+
+    def run(self, seconds, until=None):
+        """Iterate the GLib main context for up to `seconds` or until `until()`."""
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            GLib.main_context_default().iteration(False)
+            if until and until():
+                return True
+            time.sleep(0.001)
+        return False
@@ -0,0 +1,236 @@
+import argparse
+import time
+
+import numpy as np
+
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import Gst, GstVideo, GLib
+
+# Frames per second sent while nothing moves
+FLOOR_FPS = 2
+# Luma is sampled every DECIMATE pixels in both directions (80x60 for 640x480)
+DECIMATE = 8
+# A sampled pixel has changed if its luma moved by more than this...
+PIXEL_THRESHOLD = 12
+# ...and the scene is moving if this fraction of sampled pixels changed
+MOTION_FRACTION = 0.002
+# Keep the full rate this long after the last motion, so motion that starts
+# and stops between samples isn't cut into stutter
+HOLD_SECONDS = 0.5
+
+# Where luma sits in a row of each format: (byte offset, bytes per pixel).
+# RGB formats use the green channel as a stand-in.
+LUMA_LAYOUT = {
+    "I420": (0, 1), "YV12": (0, 1), "NV12": (0, 1), "NV21": (0, 1),
+    "Y42B": (0, 1), "Y444": (0, 1), "GRAY8": (0, 1),
+    "YUY2": (0, 2), "YVYU": (0, 2), "UYVY": (1, 2),
+    "RGB": (1, 3), "BGR": (1, 3), "RGBx": (1, 4), "BGRx": (1, 4),
+    "xRGB": (2, 4), "xBGR": (2, 4), "RGBA": (1, 4), "BGRA": (1, 4),
+}
+
+
+class MotionDetector:
+    """Compare a decimated copy of each frame's luma with the last frame sent."""
+
+    def __init__(self):
+        self.caps = None
+        self.layout = None
+        self.info = None
+        self.reference = None
+        self.candidate = None
+        self.score = 0.0
+
+    def set_caps(self, caps):
+        if self.caps is not None and caps.is_equal(self.caps):
+            return
+        self.caps = caps
+        self.info = GstVideo.VideoInfo.new_from_caps(caps)
+        self.layout = LUMA_LAYOUT.get(self.info.finfo.name) if self.info else None
+        self.reference = None
+        if self.info and self.layout is None:
+            print(f"Motion gate: no luma layout for {self.info.finfo.name}, passing all frames")
+
+    def moved(self, buf):
+        """Whether `buf` differs from the last accepted frame; None if it can't be sampled."""
+        if self.layout is None:
+            return None
+        luma = self.sample_luma(buf)
+        if luma is None:
+            return None
+        self.candidate = luma
+        if self.reference is None or luma.shape != self.reference.shape:
+            return True
+        changed = np.count_nonzero(np.abs(luma - self.reference) > PIXEL_THRESHOLD)
+        self.score = changed / luma.size
+        return self.score >= MOTION_FRACTION
+
+    def accept(self):
+        """The frame last passed to moved() was sent; compare later frames with it."""
+        self.reference = self.candidate
+
+    def sample_luma(self, buf):
+        """Decimated luma of `buf` as int16, copied out of the mapped buffer."""
+        offset, bpp = self.layout
+        height, width = self.info.height, self.info.width
+        stride = self.info.stride[0]
+        ok, mapping = buf.map(Gst.MapFlags.READ)
+        if not ok:
+            return None
+        try:
+            data = np.frombuffer(mapping.data, dtype=np.uint8)
+            start = self.info.offset[0]
+            rows = data[start:start + height * stride].reshape(height, stride)
+            luma = rows[::DECIMATE, offset:width * bpp:bpp * DECIMATE].astype(np.int16)
+        finally:
+            buf.unmap(mapping)
+        return luma
+
+
+class MotionGate:
+    """Drop raw frames before the encoder while the scene is static.
+
+    Frames pass at the full rate while anything moves and for HOLD_SECONDS
+    after; otherwise only the first frame of every 1/FLOOR_FPS slot of
+    capture time passes. The first moving frame always passes. VP8 handles
+    the uneven frame timing, so dropped frames are simply not sent rather
+    than duplicated.
+
+    A gate covers one camera, as a buffer probe installed with probe(), or
+    a stereo pair, as StereoBridge's `gate`. Pairs are gated after matching:
+    both frames share the pair's PTS and pass or drop together, so a static
+    scene still goes out as matched pairs whatever the phase offset between
+    the two sensors.
+    """
+
+    def __init__(self, eyes=1, floor_fps=FLOOR_FPS):
+        self.detectors = [MotionDetector() for _ in range(eyes)]
+        self.slot = Gst.SECOND // floor_fps
+        self.motion_at = None
+        self.last_slot = None
+        self.passed = 0
+        self.dropped = 0
+
+    def probe(self, pad):
+        """Gate a single camera's raw frames leaving `pad`."""
+        pad.add_probe(Gst.PadProbeType.BUFFER | Gst.PadProbeType.EVENT_DOWNSTREAM,
+                      self.on_probe)
+        return self
+
+    def on_probe(self, pad, info):
+        if info.type & Gst.PadProbeType.EVENT_DOWNSTREAM:
+            event = info.get_event()
+            if event.type == Gst.EventType.CAPS:
+                self.detectors[0].set_caps(event.parse_caps())
+            return Gst.PadProbeReturn.OK
+        buf = info.get_buffer()
+        return Gst.PadProbeReturn.OK if self.admit(buf.pts, [buf]) else Gst.PadProbeReturn.DROP
+
+    def __call__(self, pts, left, right):
+        """StereoBridge gate: whether to push the (buffer, caps) pair stamped `pts`."""
+        for detector, (buf, caps) in zip(self.detectors, (left, right)):
+            detector.set_caps(caps)
+        return self.admit(pts, [left[0], right[0]])
+
+    def admit(self, pts, bufs):
+        """Whether to send `bufs`, one frame per detector, all captured at `pts`."""
+        moved = [detector.moved(buf) for detector, buf in zip(self.detectors, bufs)]
+        if None in moved:
+            return True
+        now = time.monotonic()
+        if any(moved):
+            self.motion_at = now
+        holding = self.motion_at is not None and now - self.motion_at < HOLD_SECONDS
+        slot = pts // self.slot if pts != Gst.CLOCK_TIME_NONE else None
+        if holding or slot is None or slot != self.last_slot:
+            for detector in self.detectors:
+                detector.accept()
+            self.last_slot = slot
+            self.passed += 1
+            return True
+        self.dropped += 1
+        return False
+
+    def stats(self):
+        total = self.passed + self.dropped
+        return {"passed": self.passed, "dropped": self.dropped,
+                "pass_ratio": self.passed / total if total else 1.0,
+                "score": max(detector.score for detector in self.detectors)}
+
+
+def gate_cameras(pipe, num_cameras, floor_fps=FLOOR_FPS):
+    """Gate each camera's scaled raw output (outcaps{i}) on its own.
+
+    For stereo eyes that go through StereoBridge, pass MotionGate(eyes=2)
+    as the bridge's gate instead, so both eyes drop the same frames.
+    """
+    return [MotionGate(floor_fps=floor_fps).probe(
+                pipe.get_by_name(f"outcaps{i}").get_static_pad("src"))
+            for i in range(num_cameras)]
+
+
+# --- Benchmark: encoder CPU and bytes for a static and a moving clip ---
+
+CLIPS = {
+    "static": "videotestsrc is-live=true pattern=smpte",
+    "motion": "videotestsrc is-live=true pattern=ball",
+}
+
+
+def run_clip(source, seconds, gated):
+    from camera_branch import make_camera_branch
+
+    pipe = Gst.Pipeline.new("motion")
+    branch = make_camera_branch(0, source)
+    sink = Gst.ElementFactory.make("fakesink")
+    sink.set_property("sync", False)
+    pipe.add(branch)
+    pipe.add(sink)
+    branch.link(sink)
+    gates = gate_cameras(branch, 1) if gated else []
+    sent = {"bytes": 0}
+
+    def on_buffer(pad, info):
+        sent["bytes"] += info.get_buffer().get_size()
+        return Gst.PadProbeReturn.OK
+
+    sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+    pipe.set_state(Gst.State.PLAYING)
+
+    def run(duration):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            GLib.main_context_default().iteration(False)
+            time.sleep(0.005)
+
+    run(1)
+    sent["bytes"] = 0
+    cpu = time.process_time()
+    start = time.monotonic()
+    run(seconds)
+    elapsed = time.monotonic() - start
+    cpu = (time.process_time() - cpu) / elapsed * 100
+    pipe.set_state(Gst.State.NULL)
+    kbps = sent["bytes"] * 8 / elapsed / 1000
+    ratio = gates[0].stats()["pass_ratio"] if gates else 1.0
+    return cpu, kbps, ratio
+
+
+def benchmark(seconds):
+    for clip, source in CLIPS.items():
+        base_cpu, base_kbps, _ = run_clip(source, seconds, False)
+        cpu, kbps, ratio = run_clip(source, seconds, True)
+        print(f"{clip:7s} ungated CPU {base_cpu:5.1f}%  {base_kbps:7.1f} kbit/s | "
+              f"gated CPU {cpu:5.1f}%  {kbps:7.1f} kbit/s  {ratio * 100:5.1f}% frames sent | "
+              f"saved CPU {100 - cpu / base_cpu * 100 if base_cpu else 0:5.1f}%  "
+              f"bandwidth {100 - kbps / base_kbps * 100 if base_kbps else 0:5.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure CPU and bandwidth saved by the motion gate on static and moving clips")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    Gst.init(None)
+    benchmark(args.seconds)
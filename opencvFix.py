@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import cv2 as cv
 import numpy as np
 
@@ -11,9 +13,13 @@ cam_mat = np.array([
 dist_coeffs = np.array([[-0.20148179, 0.03270111, 0., 0., -0.00211291]])
 DIM = (1280, 720)
 
-new_cam_mat, _ = cv.getOptimalNewCameraMatrix(cam_mat, dist_coeffs, DIM, 1, DIM)
-map1, map2 = cv.initUndistortRectifyMap(cam_mat, dist_coeffs, None, new_cam_mat, DIM, cv.CV_16SC2)
+# Remap tables are built on first use rather than at import
+@lru_cache(maxsize=None)
+def undistort_maps():
+    new_cam_mat, _ = cv.getOptimalNewCameraMatrix(cam_mat, dist_coeffs, DIM, 1, DIM)
+    return cv.initUndistortRectifyMap(cam_mat, dist_coeffs, None, new_cam_mat, DIM, cv.CV_16SC2)
 
 # OpenCV filter function for GStreamer
 def undistort_gst(frame: np.ndarray) -> np.ndarray:
+    map1, map2 = undistort_maps()
     return cv.remap(frame, map1, map2, interpolation=cv.INTER_LINEAR, borderMode=cv.BORDER_CONSTANT)
\ No newline at end of file
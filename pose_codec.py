@@ -0,0 +1,295 @@
+import argparse
+import json
+import random
+import struct
+import time
+
+import numpy as np
+
+# Binary hand pose messages sent by the headset on the pose data channel
+# (src/poseCodec.ts encodes them). Little-endian layout, version 2:
+#
+#   u8 version, u8 flags, u16 epoch, u16 seq, u16 key_seq,
+#   f32 position scale, f32 rotation scale
+#   then for each hand present (left first): JOINTS x [px py pz qx qy qz qw]
+#
+# Each encoder picks a random epoch, so a restarted headset encoder, whose
+# seq starts over, is told apart from late frames of the previous one.
+#
+# Keyframes carry int16 values: positions times the position scale (chosen
+# per frame from the largest coordinate), quaternions with w >= 0 times
+# 1/32767. Delta frames carry int8 differences from the keyframe key_seq,
+# each with its own per-frame scale; they need that keyframe to decode.
+VERSION = 2
+FLAG_DELTA = 1
+HAND_FLAGS = {"left": 2, "right": 4}
+HANDS = ("left", "right")
+JOINTS = 25
+FIELDS = 7
+HEADER = struct.Struct("<BBHHHff")
+
+# A delta frame is only used if it keeps this precision (metres / quaternion
+# units per step), otherwise the encoder sends a new keyframe
+MAX_DELTA_POSITION_STEP = 0.0005
+MAX_DELTA_ROTATION_STEP = 0.0005
+KEYFRAME_INTERVAL = 30
+
+
+def seq_newer(seq, last):
+    """Whether u16 sequence number `seq` comes after `last`, across wraparound."""
+    return 0 < (seq - last) & 0xFFFF < 0x8000
+
+
+def is_keyframe(message):
+    """True for binary keyframes; used so latest-only delivery never drops one."""
+    return (isinstance(message, (bytes, bytearray)) and len(message) >= 2
+            and message[0] == VERSION and not message[1] & FLAG_DELTA)
+
+
+def poses_to_matrices(poses):
+    """(..., 7) position + quaternion poses -> (..., 4, 4) transforms."""
+    poses = np.asarray(poses, dtype=np.float32)
+    q = poses[..., 3:]
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    m = np.zeros(poses.shape[:-1] + (4, 4), dtype=np.float32)
+    m[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    m[..., 0, 1] = 2 * (x * y - z * w)
+    m[..., 0, 2] = 2 * (x * z + y * w)
+    m[..., 1, 0] = 2 * (x * y + z * w)
+    m[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    m[..., 1, 2] = 2 * (y * z - x * w)
+    m[..., 2, 0] = 2 * (x * z - y * w)
+    m[..., 2, 1] = 2 * (y * z + x * w)
+    m[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    m[..., :3, 3] = poses[..., :3]
+    m[..., 3, 3] = 1
+    return m
+
+
+def matrices_to_poses(m):
+    """(..., 4, 4) rigid transforms -> (..., 7) position + quaternion (w >= 0)."""
+    m = np.asarray(m, dtype=np.float64)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    trace = m00 + m11 + m22
+    # Shepperd's method, all four branches computed and the stable one picked
+    s = 2 * np.sqrt(np.maximum(np.stack([1 + trace, 1 + m00 - m11 - m22,
+                                         1 - m00 + m11 - m22, 1 - m00 - m11 + m22]), 1e-12))
+    a21, a02, a10 = m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]
+    b01, b02, b12 = m[..., 0, 1] + m[..., 1, 0], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1]
+    candidates = np.stack([
+        np.stack([a21 / s[0], a02 / s[0], a10 / s[0], s[0] / 4], -1),
+        np.stack([s[1] / 4, b01 / s[1], b02 / s[1], a21 / s[1]], -1),
+        np.stack([b01 / s[2], s[2] / 4, b12 / s[2], a02 / s[2]], -1),
+        np.stack([b02 / s[3], b12 / s[3], s[3] / 4, a10 / s[3]], -1),
+    ])
+    case = np.argmax(np.stack([trace, m00, m11, m22]), axis=0)
+    q = np.take_along_axis(candidates, case[None, ..., None], axis=0)[0]
+    q *= np.where(q[..., 3:] < 0, -1, 1)
+    return np.concatenate([m[..., :3, 3], q], axis=-1).astype(np.float32)
+
+
+def legacy_matrices(message):
+    """Decode the JSON format: {"left": [400 floats column-major], ...}."""
+    data = json.loads(message)
+    return {hand: np.asarray(values, dtype=np.float32).reshape(JOINTS, 4, 4).transpose(0, 2, 1)
+            for hand, values in data.items() if hand in HAND_FLAGS}
+
+
+def _scale(values, limit):
+    return max(float(np.abs(values).max()) / limit, 1e-9) if values.size else 1e-9
+
+
+class PoseEncoder:
+    """Python counterpart of the headset's encoder, for tests and benchmarks."""
+
+    def __init__(self, delta=True, keyframe_interval=KEYFRAME_INTERVAL, epoch=None):
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.epoch = random.getrandbits(16) if epoch is None else epoch
+        self.seq = 0
+        self.key = None
+        self.key_seq = 0
+        self.key_hands = None
+
+    def encode(self, hands):
+        """hands: {"left"/"right": (JOINTS, 7) poses} -> bytes."""
+        present = tuple(hand for hand in HANDS if hand in hands)
+        poses = np.stack([np.asarray(hands[hand], dtype=np.float32) for hand in present]) \
+            if present else np.zeros((0, JOINTS, FIELDS), np.float32)
+        flags = sum(HAND_FLAGS[hand] for hand in present)
+        self.seq = (self.seq + 1) & 0xFFFF
+        if self.delta and self.key is not None and present == self.key_hands and \
+                (self.seq - self.key_seq) & 0xFFFF < self.keyframe_interval:
+            message = self._encode_delta(poses, flags)
+            if message is not None:
+                return message
+        return self._encode_key(poses, flags, present)
+
+    def _encode_key(self, poses, flags, present):
+        poses = poses.copy()
+        poses[..., 3:] *= np.where(poses[..., 6:] < 0, -1, 1)
+        pos_scale = _scale(poses[..., :3], 32767)
+        rot_scale = 1 / 32767
+        values = np.empty(poses.shape, np.int16)
+        values[..., :3] = np.round(poses[..., :3] / pos_scale)
+        values[..., 3:] = np.round(poses[..., 3:] / rot_scale)
+        self.key = values.astype(np.float32)
+        self.key[..., :3] *= pos_scale
+        self.key[..., 3:] *= rot_scale
+        self.key_seq = self.seq
+        self.key_hands = present
+        return HEADER.pack(VERSION, flags, self.epoch, self.seq, self.seq,
+                           pos_scale, rot_scale) + \
+            values.astype("<i2").tobytes()
+
+    def _encode_delta(self, poses, flags):
+        poses = poses.copy()
+        # Same quaternion hemisphere as the keyframe so differences stay small
+        flip = np.sum(poses[..., 3:] * self.key[..., 3:], axis=-1, keepdims=True) < 0
+        poses[..., 3:] *= np.where(flip, -1, 1)
+        diff = poses - self.key
+        pos_scale = _scale(diff[..., :3], 127)
+        rot_scale = _scale(diff[..., 3:], 127)
+        if pos_scale > MAX_DELTA_POSITION_STEP or rot_scale > MAX_DELTA_ROTATION_STEP:
+            return None
+        values = np.empty(poses.shape, np.int8)
+        values[..., :3] = np.round(diff[..., :3] / pos_scale)
+        values[..., 3:] = np.round(diff[..., 3:] / rot_scale)
+        return HEADER.pack(VERSION, flags | FLAG_DELTA, self.epoch, self.seq, self.key_seq,
+                           pos_scale, rot_scale) + values.tobytes()
+
+
+class PoseDecoder:
+    """Decode pose messages into (JOINTS, 4, 4) matrices per hand, in bulk.
+
+    Keeps the last keyframe for delta frames; a delta whose keyframe was
+    lost decodes to None until the next keyframe arrives. The pose channel
+    is unordered, so a frame that is not newer than the last one decoded
+    (including a late keyframe, whose seq is older than any delta built on
+    the current keyframe) also decodes to None. Only frames of the same
+    epoch are compared: a keyframe of a new epoch starts over from it.
+    """
+
+    def __init__(self):
+        self.epoch = None
+        self.key = None
+        self.key_seq = None
+        self.key_flags = None
+        self.seq = None
+
+    def decode_poses(self, data):
+        """bytes -> (flags, (hands, JOINTS, 7) float32 poses), or None."""
+        if len(data) < HEADER.size:
+            return None
+        version, flags, epoch, seq, key_seq, pos_scale, rot_scale = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Unsupported pose codec version {version}")
+        delta = flags & FLAG_DELTA
+        if epoch != self.epoch:
+            # A restarted encoder; its deltas need its keyframe first
+            if delta:
+                return None
+            self.epoch = epoch
+            self.key = self.key_seq = self.key_flags = self.seq = None
+        if self.seq is not None and not seq_newer(seq, self.seq):
+            return None
+        if not delta and self.key_seq is not None and not seq_newer(seq, self.key_seq):
+            return None
+        hands = bin(flags & (HAND_FLAGS["left"] | HAND_FLAGS["right"])).count("1")
+        dtype = np.int8 if delta else np.dtype("<i2")
+        values = np.frombuffer(data, dtype=dtype, offset=HEADER.size,
+                               count=hands * JOINTS * FIELDS).reshape(hands, JOINTS, FIELDS)
+        poses = values.astype(np.float32)
+        poses[..., :3] *= pos_scale
+        poses[..., 3:] *= rot_scale
+        if delta:
+            if self.key is None or key_seq != self.key_seq or \
+                    (flags & ~FLAG_DELTA) != self.key_flags:
+                return None
+            poses += self.key
+        else:
+            self.key = poses
+            self.key_seq = seq
+            self.key_flags = flags
+        self.seq = seq
+        return flags, poses
+
+    def decode(self, data):
+        """bytes -> {"left"/"right": (JOINTS, 4, 4) matrices}, or None."""
+        decoded = self.decode_poses(data)
+        if decoded is None:
+            return None
+        flags, poses = decoded
+        matrices = poses_to_matrices(poses)
+        present = [hand for hand in HANDS if flags & HAND_FLAGS[hand]]
+        return dict(zip(present, matrices))
+
+
+# --- Benchmark: size, round-trip accuracy and throughput on synthetic hands ---
+
+def synthetic_hands(frames, rate=60, seed=0):
+    """Smoothly moving joints: (frames, 2, JOINTS, 4, 4) transforms."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames)[:, None, None] / rate
+    base = rng.uniform(-0.5, 0.5, (1, 2, JOINTS, 3)) + [0, 1.2, -0.3]
+    freq = rng.uniform(0.2, 2, (1, 2, JOINTS, 3))
+    positions = base + 0.05 * np.sin(2 * np.pi * freq * t[..., None])
+    axes = rng.normal(size=(1, 2, JOINTS, 3))
+    axes /= np.linalg.norm(axes, axis=-1, keepdims=True)
+    angles = rng.uniform(-np.pi, np.pi, (1, 2, JOINTS)) + 0.5 * np.sin(2 * np.pi * 0.7 * t)
+    quats = np.concatenate([axes * np.sin(angles / 2)[..., None],
+                            np.cos(angles / 2)[..., None]], axis=-1)
+    return poses_to_matrices(np.concatenate([np.broadcast_to(positions, quats.shape[:-1] + (3,)),
+                                             quats], axis=-1))
+
+
+def legacy_message(matrices):
+    return json.dumps({hand: m.transpose(0, 2, 1).reshape(-1).tolist()
+                       for hand, m in zip(HANDS, matrices)})
+
+
+def rotation_error_degrees(a, b):
+    r = np.einsum("...ij,...kj->...ik", a[..., :3, :3], b[..., :3, :3])
+    cos = np.clip((np.trace(r, axis1=-2, axis2=-1) - 1) / 2, -1, 1)
+    return np.degrees(np.arccos(cos))
+
+
+def benchmark(frames):
+    matrices = synthetic_hands(frames)
+    legacy = [legacy_message(m) for m in matrices]
+    poses = matrices_to_poses(matrices)
+
+    for delta in (False, True):
+        encoder = PoseEncoder(delta=delta)
+        messages = [encoder.encode(dict(zip(HANDS, p))) for p in poses]
+        decoder = PoseDecoder()
+        start = time.perf_counter()
+        decoded = [decoder.decode(m) for m in messages]
+        decode_time = time.perf_counter() - start
+        result = np.stack([np.stack([d[hand] for hand in HANDS]) for d in decoded])
+        position_error = np.abs(result[..., :3, 3] - matrices[..., :3, 3]).max(axis=-1) * 1000
+        angle_error = rotation_error_degrees(result, matrices)
+        keyframes = sum(is_keyframe(m) for m in messages)
+        size = sum(len(m) for m in messages) / frames
+        print(f"{'delta' if delta else 'keyframes only':15s} {size:6.0f} B/frame "
+              f"({len(legacy[0]) / size:5.1f}x smaller than JSON), {keyframes} keyframes")
+        print(f"{'':15s} position error mean {position_error.mean():.3f} max "
+              f"{position_error.max():.3f} mm, rotation error mean {angle_error.mean():.4f} "
+              f"max {angle_error.max():.4f} deg")
+        print(f"{'':15s} decode {frames / decode_time:8.0f} frames/s")
+
+    start = time.perf_counter()
+    for message in legacy:
+        legacy_matrices(message)
+    legacy_time = time.perf_counter() - start
+    print(f"{'JSON':15s} {sum(len(m) for m in legacy) / frames:6.0f} B/frame, "
+          f"decode {frames / legacy_time:8.0f} frames/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure size, accuracy and decode speed of the pose codec vs JSON")
+    parser.add_argument("--frames", type=int, default=3000)
+    args = parser.parse_args()
+    benchmark(args.frames)
@@ -0,0 +1,173 @@
+import gi
+gi.require_version('Gst', '1.0')
+gi.require_version('GstWebRTC', '1.0')
+from gi.repository import Gst, GstWebRTC, GLib
+
+from live_format import OUTPUT_FORMAT, format_caps, request_keyframe, scaled_format
+
+# Encoding layers per camera, best first. "scale" divides the output format.
+SIMULCAST_LAYERS = [
+    {"rid": "h", "scale": 1, "bitrate": 1500000},
+    {"rid": "m", "scale": 2, "bitrate": 500000},
+    {"rid": "l", "scale": 4, "bitrate": 150000},
+]
+
+# Stats polling and layer switching thresholds
+STATS_INTERVAL = 2
+DOWN_LOSS = 0.05
+DOWN_RTT = 0.3
+UP_LOSS = 0.01
+UP_RTT = 0.15
+# Consecutive good polls needed before stepping up a layer
+UP_POLLS = 3
+
+
+def simulcast_description(i, layers=SIMULCAST_LAYERS, output=OUTPUT_FORMAT):
+    """Launch description fragment: tee into one scaled encoder per layer.
+
+    The layers meet at an input-selector in front of the payloader, so
+    switching layer never touches the RTP caps or SSRC. Each layer has a
+    valve before its queue and only the first layer's starts open; the
+    encoders of the other layers sit idle until LayerSelector opens them.
+    """
+    parts = [f'tee name=layers{i} ']
+    for n, layer in enumerate(layers):
+        rid = layer["rid"]
+        layer_caps = format_caps(scaled_format(output, layer["scale"])).to_string()
+        drop = "false" if n == 0 else "true"
+        parts.append(
+            f'layers{i}. ! valve name=valve{i}_{rid} drop={drop} '
+            f'! queue name=queue{i}_{rid} leaky=downstream max-size-buffers=1 '
+            f'! videoscale name=scale{i}_{rid} '
+            f'! capsfilter name=layercaps{i}_{rid} caps="{layer_caps}" '
+            f'! vp8enc name=vp8enc{i}_{rid} deadline=1 target-bitrate={layer["bitrate"]} '
+            f'! select{i}. ')
+    parts.append(f'input-selector name=select{i} sync-streams=false cache-buffers=false ')
+    return "".join(parts)
+
+
+class LayerSelector:
+    """Choose which simulcast layer this session's viewer receives.
+
+    Browsers can't receive RID-multiplexed simulcast, so the layers are
+    switched here in the sender, per session. Only the sent layer is encoded:
+    a switch opens the new layer's valve, waits for its keyframe and then
+    closes the old one. In auto mode the layer follows the viewer's packet
+    loss and round-trip time reported by webrtcbin's stats. Data channel
+    commands: {"type": "set_layer", "rid": "l"} or {"rid": "auto"}.
+    Both eyes are switched together unless "camera" is given.
+    """
+
+    def __init__(self, pipe, webrtc, num_cameras, layers=SIMULCAST_LAYERS):
+        self.pipe = pipe
+        self.webrtc = webrtc
+        self.num_cameras = num_cameras
+        self.layers = layers
+        # Layer asked for and layer actually sent; they differ during a switch
+        self.current = [0] * num_cameras
+        self.active = [0] * num_cameras
+        self.auto = True
+        self.good_polls = 0
+        self.timeout_id = GLib.timeout_add_seconds(STATS_INTERVAL, self.poll_stats)
+
+    def stop(self):
+        if self.timeout_id is not None:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+
+    def select(self, index, camera=None):
+        cameras = range(self.num_cameras) if camera is None else [camera]
+        for i in cameras:
+            if self.current[i] != index:
+                self._switch(i, index)
+
+    def _valve(self, i, index, open_):
+        rid = self.layers[index]["rid"]
+        self.pipe.get_by_name(f"valve{i}_{rid}").set_property("drop", not open_)
+
+    def _switch(self, i, index):
+        rid = self.layers[index]["rid"]
+        enc = self.pipe.get_by_name(f"vp8enc{i}_{rid}")
+        selector = self.pipe.get_by_name(f"select{i}")
+        target = enc.get_static_pad("src").get_peer()
+        self.current[i] = index
+        # A switch still waiting for its keyframe is abandoned
+        for n in range(len(self.layers)):
+            if n not in (self.active[i], index):
+                self._valve(i, n, False)
+        self._valve(i, index, True)
+
+        def on_buffer(pad, info):
+            if self.current[i] != index:
+                return Gst.PadProbeReturn.REMOVE
+            if info.get_buffer().has_flags(Gst.BufferFlags.DELTA_UNIT):
+                return Gst.PadProbeReturn.OK
+            # Switch on the new layer's keyframe so the viewer can decode it
+            selector.set_property("active-pad", target)
+            previous, self.active[i] = self.active[i], index
+            if previous != index:
+                self._valve(i, previous, False)
+            print(f"Camera {i} now sending simulcast layer {rid}")
+            return Gst.PadProbeReturn.REMOVE
+
+        enc.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+        request_keyframe(enc)
+
+    def poll_stats(self):
+        if self.auto:
+            promise = Gst.Promise.new_with_change_func(self.on_stats, None)
+            self.webrtc.emit("get-stats", None, promise)
+        return GLib.SOURCE_CONTINUE
+
+    def on_stats(self, promise, _):
+        reply = promise.get_reply()
+        if not reply:
+            return
+        reports = []
+
+        def collect(field_id, value):
+            if (isinstance(value, Gst.Structure) and value.get_value("type")
+                    == GstWebRTC.WebRTCStatsType.REMOTE_INBOUND_RTP):
+                reports.append(value)
+            return True
+
+        reply.foreach(collect)
+        if not reports:
+            return
+        loss = max(r.get_value("fraction-lost") or 0 for r in reports)
+        rtt = max(r.get_value("round-trip-time") or 0 for r in reports)
+        GLib.idle_add(self.adapt, loss, rtt)
+
+    def adapt(self, loss, rtt):
+        """Step down a layer on loss/latency, step up after sustained good stats."""
+        if not self.auto:
+            return GLib.SOURCE_REMOVE
+        index = max(self.current)
+        if loss > DOWN_LOSS or rtt > DOWN_RTT:
+            self.good_polls = 0
+            if index + 1 < len(self.layers):
+                self.select(index + 1)
+        elif loss < UP_LOSS and rtt < UP_RTT:
+            self.good_polls += 1
+            if self.good_polls >= UP_POLLS and index > 0:
+                self.good_polls = 0
+                self.select(index - 1)
+        else:
+            self.good_polls = 0
+        return GLib.SOURCE_REMOVE
+
+    def handle_message(self, msg):
+        """Apply a "set_layer" data channel command. Returns True if handled."""
+        if msg.get("type") != "set_layer":
+            return False
+        rid = msg.get("rid", "auto")
+        if rid == "auto":
+            self.auto = True
+            return True
+        rids = [layer["rid"] for layer in self.layers]
+        if rid not in rids:
+            print(f"Unknown simulcast layer {rid}")
+            return True
+        self.auto = False
+        GLib.idle_add(self.select, rids.index(rid), msg.get("camera"))
+        return True
@@ -0,0 +1,210 @@
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from live_format import CAPTURE_FORMAT, format_caps
+
+SNAPSHOT_PORT = 8080
+# A camera is encoded at most once per interval, however many clients poll it
+SNAPSHOT_INTERVAL = 1.0
+JPEG_QUALITY = 80
+
+# Raw formats the tap can deliver -> (bytes per pixel, cv2 conversion to BGR)
+JPEG_CONVERSIONS = {
+    "YUY2": (2, "COLOR_YUV2BGR_YUY2"),
+    "UYVY": (2, "COLOR_YUV2BGR_UYVY"),
+    "RGB": (3, "COLOR_RGB2BGR"),
+    "BGR": (3, None),
+    "RGBx": (4, "COLOR_RGBA2BGR"),
+    "BGRx": (4, "COLOR_BGRA2BGR"),
+}
+
+
+def snapshot_tap(i):
+    """Fragment placed in camera i's branch: a tee that feeds the snapshot sink."""
+    return f'tee name=snaptee{i}'
+
+
+def snapshot_description(i):
+    """Leaky branch off snaptee{i} that keeps only the newest frame.
+
+    Nothing in it touches the pixels; frames are only converted and
+    encoded when a client asks for them.
+    """
+    return (f'snaptee{i}. ! queue name=snapqueue{i} leaky=downstream max-size-buffers=1 '
+            f'! appsink name=snapsink{i} sync=false max-buffers=1 drop=true '
+            f'enable-last-sample=false')
+
+
+def capture_description(i, source, capture=CAPTURE_FORMAT):
+    """Camera i's source feeding only its snapshot sink, for use between sessions."""
+    capture_caps = format_caps(capture, "YUY2").to_string()
+    return (f'{source} name=camsrc{i} ! capsfilter name=caps{i} caps="{capture_caps}" '
+            f'! {snapshot_tap(i)} {snapshot_description(i)}')
+
+
+def encode_jpeg(sample, quality=JPEG_QUALITY):
+    import cv2
+    from inbound import Frame
+
+    with Frame(sample) as frame:
+        if frame.format not in JPEG_CONVERSIONS:
+            raise ValueError(f"No JPEG conversion for {frame.format}")
+        bpp, conversion = JPEG_CONVERSIONS[frame.format]
+        pixels = frame.plane(0)[:frame.height, :frame.width * bpp]
+        pixels = pixels.reshape(frame.height, frame.width, bpp)
+        image = cv2.cvtColor(pixels, getattr(cv2, conversion)) if conversion else pixels
+        ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return jpeg.tobytes()
+
+
+class CameraSnapshot:
+    def __init__(self, appsink, interval=SNAPSHOT_INTERVAL):
+        self.appsink = appsink
+        self.interval = interval
+        self.jpeg = None
+        self.encoded_at = 0
+        self.lock = threading.Lock()
+
+    def latest(self):
+        """JPEG bytes of a recent frame, or None if the camera sent none yet."""
+        with self.lock:
+            if self.jpeg is None or time.monotonic() - self.encoded_at >= self.interval:
+                sample = self.appsink.emit("try-pull-sample", 0)
+                if sample is not None:
+                    self.jpeg = encode_jpeg(sample)
+                    self.encoded_at = time.monotonic()
+            return self.jpeg
+
+
+class SnapshotServer:
+    """Serve /snapshot/<camera>.jpg from the running pipeline's snapshot sinks.
+
+    attach() after each pipeline is built and detach() before it is torn
+    down. Between sessions, capture() runs a capture-only pipeline so
+    snapshots keep working; release() stops it and frees the cameras before
+    the next session opens them. The HTTP server runs on its own threads,
+    one per request.
+    """
+
+    def __init__(self, port=SNAPSHOT_PORT, interval=SNAPSHOT_INTERVAL):
+        self.interval = interval
+        self.cameras = []
+        self.idle = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       name="snapshot-http", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        print(f"Snapshot server running on http://0.0.0.0:{self.httpd.server_port}/snapshot/0.jpg")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def attach(self, pipe, num_cameras):
+        self.cameras = [CameraSnapshot(pipe.get_by_name(f"snapsink{i}"), self.interval)
+                        for i in range(num_cameras)]
+
+    def detach(self):
+        self.cameras = []
+
+    def capture(self, sources):
+        if self.idle is not None:
+            return
+        self.idle = Gst.parse_launch(
+            " ".join(capture_description(i, source) for i, source in enumerate(sources)))
+        bus = self.idle.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::error", self.on_error)
+        self.attach(self.idle, len(sources))
+        self.idle.set_state(Gst.State.PLAYING)
+
+    def release(self):
+        if self.idle is None:
+            return
+        self.detach()
+        self.idle.set_state(Gst.State.NULL)
+        # The cameras have to be closed before a session can open them
+        self.idle.get_state(Gst.CLOCK_TIME_NONE)
+        self.idle.get_bus().remove_signal_watch()
+        self.idle = None
+
+    def on_error(self, bus, message):
+        err, debug = message.parse_error()
+        print(f"Snapshot capture error: {err.message}")
+
+    def handle(self, request):
+        match = re.fullmatch(r"/snapshot/(\d+)\.jpg", request.path.split("?")[0])
+        cameras = self.cameras
+        if not match:
+            request.send_error(404)
+            return
+        i = int(match.group(1))
+        if i >= len(cameras):
+            request.send_error(503 if not cameras else 404)
+            return
+        try:
+            jpeg = cameras[i].latest()
+        except ValueError as e:
+            request.send_error(500, str(e))
+            return
+        if jpeg is None:
+            request.send_error(503, "No frame yet")
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", "image/jpeg")
+        request.send_header("Content-Length", str(len(jpeg)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        request.wfile.write(jpeg)
+
+
+# --- Standalone: serve snapshots of test cameras ---
+
+if __name__ == "__main__":
+    from camera_branch import TEST_SOURCE, make_camera_branch
+
+    parser = argparse.ArgumentParser(description="Serve JPEG snapshots of test cameras")
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--port", type=int, default=SNAPSHOT_PORT)
+    parser.add_argument("--interval", type=float, default=SNAPSHOT_INTERVAL)
+    args = parser.parse_args()
+    Gst.init(None)
+
+    pipe = Gst.Pipeline.new("snapshots")
+    for i in range(args.cameras):
+        branch = make_camera_branch(i, TEST_SOURCE, snapshot=True)
+        sink = Gst.ElementFactory.make("fakesink")
+        pipe.add(branch)
+        pipe.add(sink)
+        branch.link(sink)
+    server = SnapshotServer(args.port, args.interval)
+    server.attach(pipe, args.cameras)
+    server.start()
+    pipe.set_state(Gst.State.PLAYING)
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+    pipe.set_state(Gst.State.NULL)
+    server.stop()
@@ -0,0 +1,241 @@
+# Reconnect soak test for gstreamer.py's WebRTCServer: runs the server
+# in-process on videotestsrc cameras and drives HELLO / connect / disconnect
+# cycles over a real websocket, answering with a webrtcbin viewer so every
+# cycle sets up ICE, DTLS, SCTP data channels and media. After a warm-up it samples RSS,
+# open fds, threads, Python heap (tracemalloc) and live GStreamer objects
+# (GstLeaks tracer, if available) and exits nonzero if any of them grew.
+import os
+
+# The leaks tracer has to be enabled before gstreamer.py calls Gst.init
+os.environ.setdefault("GST_TRACERS", "leaks")
+
+import argparse
+import asyncio
+import json
+import threading
+import tracemalloc
+
+import websockets
+
+from gstreamer import Gst, WebRTCServer, glib_main_loop_iteration, VIDEO_SOURCES
+from gi.repository import GstSdp, GstWebRTC
+from camera_branch import TEST_SOURCE
+from data_channels import CHANNELS
+
+WARMUP_CYCLES = 20
+CONNECT_TIMEOUT = 10
+CLOSE_TIMEOUT = 10
+
+# Growth allowed between the end of warm-up and the last cycle
+LIMITS = {
+    "rss_mb": 20,
+    "fds": 2,
+    "threads": 2,
+    "py_mb": 5,
+    "gst_objects": 10,
+}
+
+
+def leaks_tracer():
+    for tracer in Gst.tracing_get_active_tracers():
+        if tracer.__gtype__.name == "GstLeaksTracer":
+            return tracer
+    return None
+
+
+def process_stats(tracer=None):
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    stats = {
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+        "fds": len(os.listdir("/proc/self/fd")),
+        # Native threads, including GStreamer's streaming and libnice threads
+        "threads": int(status["Threads"]),
+        "py_threads": threading.active_count(),
+        "py_mb": tracemalloc.get_traced_memory()[0] / 1e6,
+    }
+    if tracer is not None:
+        live = tracer.emit("get-live-objects")
+        stats["gst_objects"] = len(live.get_value("live-objects-list"))
+    return stats
+
+
+def format_stats(cycle, stats):
+    fields = "  ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}"
+                       for k, v in stats.items())
+    return f"cycle {cycle:5d}  {fields}"
+
+
+class Viewer:
+    """Answering webrtcbin standing in for the browser, like LoopbackPair's answerer.
+
+    The robot's transceivers are sendonly, so the answer is recvonly and no
+    media flows back to it; the viewer decodes the robot's video instead.
+    """
+
+    def __init__(self, loop, ws):
+        self.loop = loop
+        self.ws = ws
+        self.pipe = Gst.Pipeline.new("viewer")
+        self.webrtc = Gst.parse_launch("webrtcbin name=viewer bundle-policy=max-bundle")
+        self.pipe.add(self.webrtc)
+        self.channels = []
+        self.decoded = False
+        self.webrtc.connect("on-ice-candidate", self.on_ice_candidate)
+        self.webrtc.connect("on-data-channel", self.on_data_channel)
+        self.webrtc.connect("pad-added", self.on_pad_added)
+        self.pipe.set_state(Gst.State.PLAYING)
+
+    def stop(self):
+        self.pipe.set_state(Gst.State.NULL)
+        self.pipe.get_state(Gst.CLOCK_TIME_NONE)
+        self.channels = []
+
+    def send(self, msg):
+        asyncio.run_coroutine_threadsafe(self.ws.send(json.dumps(msg)), self.loop)
+
+    def handle(self, msg):
+        if "sdp" in msg and msg["sdp"]["type"] == "offer":
+            res, sdpmsg = GstSdp.SDPMessage.new()
+            GstSdp.sdp_message_parse_buffer(msg["sdp"]["sdp"].encode(), sdpmsg)
+            offer = GstWebRTC.WebRTCSessionDescription.new(GstWebRTC.WebRTCSDPType.OFFER, sdpmsg)
+            self.webrtc.emit("set-remote-description", offer, Gst.Promise.new())
+            promise = Gst.Promise.new_with_change_func(self.on_answer_created, None)
+            self.webrtc.emit("create-answer", None, promise)
+        elif "ice" in msg:
+            self.webrtc.emit("add-ice-candidate", msg["ice"]["sdpMLineIndex"], msg["ice"]["candidate"])
+
+    def on_answer_created(self, promise, _):
+        answer = promise.get_reply().get_value("answer")
+        self.webrtc.emit("set-local-description", answer, Gst.Promise.new())
+        self.send({"sdp": {"type": "answer", "sdp": answer.sdp.as_text()}})
+
+    def on_ice_candidate(self, element, mlineindex, candidate):
+        self.send({"ice": {"candidate": candidate, "sdpMLineIndex": mlineindex}})
+
+    def on_data_channel(self, element, channel):
+        self.channels.append(channel)
+
+    def on_pad_added(self, element, pad):
+        if pad.direction != Gst.PadDirection.SRC:
+            return
+        decodebin = Gst.ElementFactory.make("decodebin")
+        decodebin.connect("pad-added", self.on_decoded_pad)
+        self.pipe.add(decodebin)
+        decodebin.sync_state_with_parent()
+        pad.link(decodebin.get_static_pad("sink"))
+
+    def on_decoded_pad(self, decodebin, pad):
+        sink = Gst.ElementFactory.make("fakesink")
+        sink.set_property("sync", False)
+        self.pipe.add(sink)
+        sink.sync_state_with_parent()
+        pad.link(sink.get_static_pad("sink"))
+
+        def on_buffer(pad, info):
+            self.decoded = True
+            return Gst.PadProbeReturn.REMOVE
+
+        pad.add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+
+    def ready(self):
+        """Connected, every data channel open and a frame decoded."""
+        connected = (self.webrtc.get_property("connection-state")
+                     == GstWebRTC.WebRTCPeerConnectionState.CONNECTED)
+        channels = list(self.channels)
+        opened = len(channels) == len(CHANNELS) and all(
+            ch.props.ready_state == GstWebRTC.WebRTCDataChannelState.OPEN for ch in channels)
+        return connected and opened and self.decoded
+
+
+async def session(uri, hello):
+    """Connect, say HELLO, negotiate until media flows, then hang up."""
+    async with websockets.connect(uri) as ws:
+        viewer = Viewer(asyncio.get_running_loop(), ws)
+
+        async def receive():
+            async for message in ws:
+                viewer.handle(json.loads(message))
+
+        reader = asyncio.create_task(receive())
+        try:
+            await ws.send(hello)
+            for _ in range(int(CONNECT_TIMEOUT / 0.01)):
+                if viewer.ready():
+                    return
+                if reader.done():
+                    break
+                await asyncio.sleep(0.01)
+            raise RuntimeError("Viewer did not connect, open its data channels and decode video")
+        finally:
+            reader.cancel()
+            viewer.stop()
+
+
+async def wait_closed(server):
+    for _ in range(int(CLOSE_TIMEOUT / 0.01)):
+        if server.pipe is None:
+            return
+        await asyncio.sleep(0.01)
+    raise RuntimeError("Server did not close the pipeline after disconnect")
+
+
+async def soak(cycles, sample_every, audio):
+    loop = asyncio.get_running_loop()
+    # Host candidates are enough to reach the in-process viewer
+    server = WebRTCServer(loop, [TEST_SOURCE] * len(VIDEO_SOURCES), ice_mode="host",
+                          pregather=False, snapshot_port=None)
+    hello = json.dumps({"type": "HELLO", "audio": True}) if audio else "HELLO"
+    tracer = leaks_tracer()
+    if tracer is None:
+        print("GstLeaks tracer not available, not counting GStreamer objects")
+    glib_task = asyncio.create_task(glib_main_loop_iteration())
+
+    async with websockets.serve(server.websocket_handler, "127.0.0.1", 0) as ws_server:
+        port = ws_server.sockets[0].getsockname()[1]
+        uri = f"ws://127.0.0.1:{port}"
+
+        for cycle in range(WARMUP_CYCLES):
+            await session(uri, hello)
+            await wait_closed(server)
+        tracemalloc.start()
+        baseline_heap = tracemalloc.take_snapshot()
+        baseline = process_stats(tracer)
+        print(format_stats(0, baseline))
+
+        for cycle in range(1, cycles + 1):
+            await session(uri, hello)
+            await wait_closed(server)
+            if cycle % sample_every == 0 or cycle == cycles:
+                print(format_stats(cycle, process_stats(tracer)))
+
+        final = process_stats(tracer)
+        final_heap = tracemalloc.take_snapshot()
+
+    glib_task.cancel()
+
+    failed = []
+    for key, limit in LIMITS.items():
+        if key in final and final[key] - baseline[key] > limit:
+            failed.append(f"{key} grew {final[key] - baseline[key]:.1f} (allowed {limit})")
+    if failed:
+        print("FAIL: " + "; ".join(failed))
+        print("Largest Python allocation growth:")
+        for stat in final_heap.compare_to(baseline_heap, "lineno")[:10]:
+            print(f"  {stat}")
+        if tracer is not None:
+            tracer.emit("log-live-objects")
+    else:
+        print(f"PASS: {cycles} reconnects without growth")
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive HELLO/connect/disconnect cycles against a videotestsrc server and check for leaks")
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--audio", action="store_true", help="ask for the audio track too")
+    args = parser.parse_args()
+    ok = asyncio.run(soak(args.cycles, args.sample_every, args.audio))
+    raise SystemExit(0 if ok else 1)
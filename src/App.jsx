@@ -9,6 +9,7 @@ function App() {
   const [isConnected, setIsConnected] = useState(false);
   const [streams, setStreams] = useState([]); // Array of MediaStreams
   const [activeCameras, setActiveCameras] = useState([0]); // Camera 0 starts active
+  const [poseChannel, setPoseChannel] = useState(null); // Robot's "pose" data channel
 
   const handleConnect = () => {
     setIsConnected(true);
@@ -190,6 +191,7 @@ function App() {
             url={url}
             signalingUrl="10.33.13.62"
             activeCameras={activeCameras}
+            setPoseChannel={setPoseChannel}
           />
 
           {/* Conditionally mount the view component based on selected mode */}
@@ -199,11 +201,13 @@ function App() {
             //   streamLeft={streams[0] || null} 
             //   streamRight={streams[1] || null} 
             //   url={url}
+            //   poseChannel={poseChannel}
             // />
           ) : viewMode === 'billboard' ? (
             <Billboard 
               stream={streams[0] || null}
               url={url}
+              poseChannel={poseChannel}
             />
           ) : (
             <SideBySideVideo 
@@ -1,18 +1,28 @@
 import React, { useRef, useState, useEffect } from 'react';
+import { PoseEncoder, collectHandPoses, legacyHandMessage } from './poseCodec';
 import './webxr.d.ts';
 
 interface BillboardProps {
   stream: MediaStream | null;
   url: string;
+  poseChannel: RTCDataChannel | null;
 }
 
-export default function Billboard({ stream, url }: BillboardProps) {
+export default function Billboard({ stream, url, poseChannel }: BillboardProps) {
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const videoRef = useRef<HTMLVideoElement>(null);
   const lastHandSendRef = useRef<number>(0);
   const [started, setStarted] = useState(false);
   const [status, setStatus] = useState('');
   const wsRef = useRef<WebSocket | null>(null);
+  const poseEncoderRef = useRef(new PoseEncoder());
+  const poseChannelRef = useRef<RTCDataChannel | null>(null);
+
+  useEffect(() => {
+    // A new channel is a new robot session whose decoder needs a keyframe first
+    poseChannelRef.current = poseChannel;
+    poseEncoderRef.current = new PoseEncoder();
+  }, [poseChannel]);
   
   useEffect(() => {
     // Use the first available stream for the billboard
@@ -392,53 +402,28 @@ export default function Billboard({ stream, url }: BillboardProps) {
       return;
     }
     lastHandSendRef.current = now;
-    
-    if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) {
-      return;
-    }
 
-    const handData: any = {};
-
-    const JOINT_ORDER = [
-      "wrist", "thumb-metacarpal", "thumb-phalanx-proximal", "thumb-phalanx-distal", "thumb-tip",
-      "index-finger-metacarpal", "index-finger-phalanx-proximal", "index-finger-phalanx-intermediate", 
-      "index-finger-phalanx-distal", "index-finger-tip", "middle-finger-metacarpal", 
-      "middle-finger-phalanx-proximal", "middle-finger-phalanx-intermediate", "middle-finger-phalanx-distal",
-      "middle-finger-tip", "ring-finger-metacarpal", "ring-finger-phalanx-proximal", 
-      "ring-finger-phalanx-intermediate", "ring-finger-phalanx-distal", "ring-finger-tip",
-      "pinky-finger-metacarpal", "pinky-finger-phalanx-proximal", "pinky-finger-phalanx-intermediate",
-      "pinky-finger-phalanx-distal", "pinky-finger-tip"
-    ];
-
-    for (const inputSource of frame.session.inputSources) {
-      if (inputSource.hand) {
-        const handedness = inputSource.handedness;
-        const hand = inputSource.hand;
-        const continuousArray: number[] = [];
-        
-        for (let i = 0; i < JOINT_ORDER.length; i++) {
-          const jointName = JOINT_ORDER[i];
-          const joint = hand.get(jointName as XRHandJoint);
-          
-          if (joint && frame.getJointPose) {
-            const jointPose = frame.getJointPose(joint, referenceSpace);
-            if (jointPose) {
-              continuousArray.push(...Array.from(jointPose.transform.matrix) as number[]);
-            } else {
-              continuousArray.push(1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1);
-            }
-          } else {
-            continuousArray.push(1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1);
-          }
+    // Binary poses to the robot on its pose data channel
+    const channel = poseChannelRef.current;
+    if (channel && channel.readyState === 'open') {
+      const hands = collectHandPoses(frame, referenceSpace);
+      if (Object.keys(hands).length > 0) {
+        try {
+          channel.send(poseEncoderRef.current.encode(hands));
+        } catch (error) {
+          console.log(`Failed to send hand poses: ${error}`);
         }
-        
-        handData[handedness] = continuousArray;
       }
     }
 
-    if (Object.keys(handData).length > 0) {
+    // The hand-tracking relay still reads the JSON matrices
+    if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) {
+      return;
+    }
+    const message = legacyHandMessage(frame, referenceSpace);
+    if (message) {
       try {
-        wsRef.current!.send(JSON.stringify(handData));
+        wsRef.current.send(message);
       } catch (error) {
         console.log(`Failed to send hand tracking data: ${error}`);
       }
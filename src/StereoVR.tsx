@@ -1,12 +1,14 @@
 import React, { useRef, useState, useEffect } from 'react';
+import { PoseEncoder, collectHandPoses, legacyHandMessage } from './poseCodec';
 
 interface StereoVRProps {
   streamLeft: MediaStream | null;
   streamRight: MediaStream | null;
   url: string;
+  poseChannel: RTCDataChannel | null;
 }
 
-export default function StereoVR({ streamLeft, streamRight, url }: StereoVRProps) {
+export default function StereoVR({ streamLeft, streamRight, url, poseChannel }: StereoVRProps) {
   const canvasRef = useRef(null);
   const leftVideoRef = useRef(null);
   const rightVideoRef = useRef(null);
@@ -15,6 +17,14 @@ export default function StereoVR({ streamLeft, streamRight, url }: StereoVRProps
   const [started, setStarted] = useState(false);
   const [status, setStatus] = useState('');
   const wsRef = useRef<WebSocket | null>(null);
+  const poseEncoderRef = useRef(new PoseEncoder());
+  const poseChannelRef = useRef<RTCDataChannel | null>(null);
+
+  useEffect(() => {
+    // A new channel is a new robot session whose decoder needs a keyframe first
+    poseChannelRef.current = poseChannel;
+    poseEncoderRef.current = new PoseEncoder();
+  }, [poseChannel]);
   
   useEffect(() => {
     // Whenever streamLeft updates, set it as srcObject for left video element
@@ -343,90 +353,24 @@ export default function StereoVR({ streamLeft, streamRight, url }: StereoVRProps
       console.log('Hand tracking WebSocket not open');
     }
 
-    const handData: any = {};
-
-    // Process each input source (hands)
-    // Joint order as specified in the table
-const JOINT_ORDER = [
-  "wrist",                              // 0
-  "thumb-metacarpal",                   // 1
-  "thumb-phalanx-proximal",            // 2
-  "thumb-phalanx-distal",              // 3
-  "thumb-tip",                         // 4
-  "index-finger-metacarpal",           // 5
-  "index-finger-phalanx-proximal",     // 6
-  "index-finger-phalanx-intermediate", // 7
-  "index-finger-phalanx-distal",       // 8
-  "index-finger-tip",                  // 9
-  "middle-finger-metacarpal",          // 10
-  "middle-finger-phalanx-proximal",    // 11
-  "middle-finger-phalanx-intermediate", // 12
-  "middle-finger-phalanx-distal",      // 13
-  "middle-finger-tip",                 // 14
-  "ring-finger-metacarpal",            // 15
-  "ring-finger-phalanx-proximal",      // 16
-  "ring-finger-phalanx-intermediate",  // 17
-  "ring-finger-phalanx-distal",        // 18
-  "ring-finger-tip",                   // 19
-  "pinky-finger-metacarpal",           // 20
-  "pinky-finger-phalanx-proximal",     // 21
-  "pinky-finger-phalanx-intermediate", // 22
-  "pinky-finger-phalanx-distal",       // 23
-  "pinky-finger-tip"                   // 24
-];
-
-// Updated hand tracking code
-// Process each input source (hands)
-for (const inputSource of frame.session.inputSources) {
-  if (inputSource.hand) {
-    const handedness = inputSource.handedness; // 'left' or 'right'
-    const hand = inputSource.hand;
-    
-    // Create the continuous array in the correct order with a single loop
-    const continuousArray: number[] = [];
-    
-    for (let i = 0; i < JOINT_ORDER.length; i++) {
-      const jointName = JOINT_ORDER[i];
-      const joint = hand.get(jointName as XRHandJoint);
-      
-      if (joint && frame.getJointPose) {
-        const jointPose = frame.getJointPose(joint, referenceSpace);
-        if (jointPose) {
-          // Add the 16 matrix values for this joint
-          continuousArray.push(...Array.from(jointPose.transform.matrix));
-        } else {
-          // Joint pose not available - add identity matrix (16 values)
-          continuousArray.push(
-            1, 0, 0, 0,  // Column 1
-            0, 1, 0, 0,  // Column 2
-            0, 0, 1, 0,  // Column 3
-            0, 0, 0, 1   // Column 4
-          );
+    // Binary poses to the robot on its pose data channel
+    const channel = poseChannelRef.current;
+    if (channel && channel.readyState === 'open') {
+      const hands = collectHandPoses(frame, referenceSpace);
+      if (Object.keys(hands).length > 0) {
+        try {
+          channel.send(poseEncoderRef.current.encode(hands));
+        } catch (error) {
+          console.log(`Failed to send hand poses: ${error}`);
         }
-      } else {
-        // Joint not found - add identity matrix (16 values)
-        console.warn(`Joint ${jointName} not found`);
-        continuousArray.push(
-          1, 0, 0, 0,  // Column 1
-          0, 1, 0, 0,  // Column 2
-          0, 0, 1, 0,  // Column 3
-          0, 0, 0, 1   // Column 4
-        );
       }
     }
-    
-    // Store the continuous array (should be 25 joints * 16 values = 400 total)
-    handData[handedness] = continuousArray
-    
-    // Optional: Also store individual joint data if you need it elsewhere
-    // handData.hands[handedness].joints = jointData;
-  }
-}
 
-    // Send hand tracking data if we have any hands
-    if (Object.keys(handData).length > 0) {
+    // The hand-tracking relay still reads the JSON matrices
+    const message = legacyHandMessage(frame, referenceSpace);
+    if (message) {
       try {
-        wsRef.current!.send(JSON.stringify(handData));
+        wsRef.current!.send(message);
       } catch (error) {
         console.log(`Failed to send hand tracking data: ${error}`);
       }
@@ -14,6 +14,8 @@ interface VideoProps {
   url: string;
   signalingUrl: string;
   activeCameras: number[];
+  // Receives the robot's "pose" data channel once it opens, null when it closes
+  setPoseChannel?: (channel: RTCDataChannel | null) => void;
 }
 
 export default function VideoScreenWeb({
@@ -24,10 +26,11 @@ export default function VideoScreenWeb({
   signalingUrl,
   url,
   activeCameras,
+  setPoseChannel,
 }: VideoProps) {
   const pc = useRef<RTCPeerConnection | null>(null);
   const ws = useRef<WebSocket | null>(null);
-  const dataChannel = useRef<RTCDataChannel | null>(null);
+  const dataChannels = useRef<Record<string, RTCDataChannel>>({});
   const streamsAdded = useRef(0);
   const currentStreams = useRef<MediaStream[]>([]);
 
@@ -64,17 +67,29 @@ export default function VideoScreenWeb({
       };
 
       pc.current.ondatachannel = (event) => {
-        console.log('Data channel received:', event.channel.label);
-        dataChannel.current = event.channel;
+        const channel = event.channel;
+        console.log('Data channel received:', channel.label);
+        // The robot opens one channel per purpose: pose, control and telemetry
+        dataChannels.current[channel.label] = channel;
 
-        dataChannel.current.onmessage = (msg) => {
-          console.log('Message from robot:', msg.data);
+        channel.onmessage = (msg) => {
+          console.log(`Message from robot on ${channel.label}:`, msg.data);
+        };
+        channel.onopen = () => {
+          console.log(`Data channel ${channel.label} opened`);
+          if (channel.label === 'pose') {
+            // Hand poses go out as binary pose codec messages
+            channel.binaryType = 'arraybuffer';
+            setPoseChannel?.(channel);
+          }
+        };
+        channel.onclose = () => {
+          console.log(`Data channel ${channel.label} closed`);
+          if (channel.label === 'pose') setPoseChannel?.(null);
         };
-        dataChannel.current.onopen = () => console.log('Data channel opened');
-        dataChannel.current.onclose = () => console.log('Data channel closed');
       };
     },
-    [setStreams]
+    [setStreams, setPoseChannel]
   );
 
   const setupWebSocket = useCallback(() => {
@@ -129,15 +144,16 @@ export default function VideoScreenWeb({
 
   const cleanup = useCallback(() => {
     console.log('Cleaning up WebRTC connection');
-    dataChannel.current?.close();
+    Object.values(dataChannels.current).forEach((channel) => channel.close());
     pc.current?.getSenders().forEach((sender) => sender.track?.stop());
     pc.current?.close();
-    dataChannel.current = null;
+    dataChannels.current = {};
+    setPoseChannel?.(null);
     pc.current = null;
     streamsAdded.current = 0;
     currentStreams.current = [];
     setStreams([]);
-  }, [setStreams]);
+  }, [setStreams, setPoseChannel]);
 
   const renegotiate = useCallback(async () => {
     cleanup();
@@ -159,8 +175,10 @@ export default function VideoScreenWeb({
   }, []);
 
   useEffect(() => {
-    if (dataChannel.current?.readyState === 'open') {
-      dataChannel.current.send(JSON.stringify(vector));
+    // The pose channel only carries binary frames; JSON commands go on control
+    const controlChannel = dataChannels.current['control'] ?? dataChannels.current['chat'];
+    if (controlChannel?.readyState === 'open') {
+      controlChannel.send(JSON.stringify(vector));
     } else {
       console.log('Data channel not open');
     }
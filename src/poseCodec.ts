@@ -0,0 +1,167 @@
+// Compact binary hand pose messages, sent on the robot's "pose" data channel
+// and decoded there by pose_codec.py.
+// Layout (little-endian), version 2:
+//   u8 version, u8 flags, u16 epoch, u16 seq, u16 keySeq,
+//   f32 positionScale, f32 rotationScale
+//   then for each hand present (left first): 25 joints x [px py pz qx qy qz qw]
+// Keyframes hold int16 values, delta frames int8 differences from keyframe keySeq.
+// Every encoder picks a random epoch, so the robot can tell a new encoder's
+// restarted seq from late frames of the previous one.
+
+export const POSE_CODEC_VERSION = 2;
+const FLAG_DELTA = 1;
+const HAND_FLAGS: Record<string, number> = { left: 2, right: 4 };
+const HANDS = ['left', 'right'];
+const HEADER_SIZE = 16;
+const FIELDS = 7;
+
+// Keep in sync with pose_codec.py
+const MAX_DELTA_POSITION_STEP = 0.0005;
+const MAX_DELTA_ROTATION_STEP = 0.0005;
+const KEYFRAME_INTERVAL = 30;
+
+export const JOINT_ORDER = [
+  "wrist", "thumb-metacarpal", "thumb-phalanx-proximal", "thumb-phalanx-distal", "thumb-tip",
+  "index-finger-metacarpal", "index-finger-phalanx-proximal", "index-finger-phalanx-intermediate",
+  "index-finger-phalanx-distal", "index-finger-tip", "middle-finger-metacarpal",
+  "middle-finger-phalanx-proximal", "middle-finger-phalanx-intermediate", "middle-finger-phalanx-distal",
+  "middle-finger-tip", "ring-finger-metacarpal", "ring-finger-phalanx-proximal",
+  "ring-finger-phalanx-intermediate", "ring-finger-phalanx-distal", "ring-finger-tip",
+  "pinky-finger-metacarpal", "pinky-finger-phalanx-proximal", "pinky-finger-phalanx-intermediate",
+  "pinky-finger-phalanx-distal", "pinky-finger-tip"
+];
+
+// Joints without a pose are sent as the identity transform
+const IDENTITY_POSE = [0, 0, 0, 0, 0, 0, 1];
+
+/** Position + quaternion of every joint of each tracked hand, in JOINT_ORDER. */
+export function collectHandPoses(frame: XRFrame, referenceSpace: XRReferenceSpace) {
+  const hands: Record<string, Float32Array> = {};
+  for (const inputSource of frame.session.inputSources) {
+    if (!inputSource.hand || !(inputSource.handedness in HAND_FLAGS)) continue;
+    const poses = new Float32Array(JOINT_ORDER.length * FIELDS);
+    JOINT_ORDER.forEach((jointName, i) => {
+      const joint = inputSource.hand!.get(jointName as XRHandJoint);
+      const jointPose = joint && frame.getJointPose ? frame.getJointPose(joint, referenceSpace) : null;
+      if (jointPose) {
+        const { position: p, orientation: q } = jointPose.transform;
+        poses.set([p.x, p.y, p.z, q.x, q.y, q.z, q.w], i * FIELDS);
+      } else {
+        poses.set(IDENTITY_POSE, i * FIELDS);
+      }
+    });
+    hands[inputSource.handedness] = poses;
+  }
+  return hands;
+}
+
+const IDENTITY_MATRIX = [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1];
+
+/** The JSON format read by the hand-tracking WebSocket relay: for each tracked
+ * hand, 25 column-major 4x4 joint matrices as 400 numbers. Null without hands. */
+export function legacyHandMessage(frame: XRFrame, referenceSpace: XRReferenceSpace) {
+  const handData: Record<string, number[]> = {};
+  for (const inputSource of frame.session.inputSources) {
+    if (!inputSource.hand) continue;
+    const matrices: number[] = [];
+    for (const jointName of JOINT_ORDER) {
+      const joint = inputSource.hand.get(jointName as XRHandJoint);
+      const jointPose = joint && frame.getJointPose ? frame.getJointPose(joint, referenceSpace) : null;
+      matrices.push(...(jointPose ? Array.from(jointPose.transform.matrix) : IDENTITY_MATRIX));
+    }
+    handData[inputSource.handedness] = matrices;
+  }
+  return Object.keys(handData).length > 0 ? JSON.stringify(handData) : null;
+}
+
+function maxAbs(values: Float32Array, offset: number, count: number) {
+  let max = 0;
+  for (let i = 0; i < values.length; i += FIELDS) {
+    for (let k = offset; k < offset + count; k++) max = Math.max(max, Math.abs(values[i + k]));
+  }
+  return max;
+}
+
+export class PoseEncoder {
+  private epoch = Math.floor(Math.random() * 0x10000);
+  private seq = 0;
+  private keySeq = 0;
+  private key: Float32Array | null = null;
+  private keyFlags = 0;
+
+  constructor(private delta = true) {}
+
+  /** Encode the hands from collectHandPoses into one message. */
+  encode(hands: Record<string, Float32Array>): ArrayBuffer {
+    const present = HANDS.filter((hand) => hands[hand]);
+    const flags = present.reduce((f, hand) => f | HAND_FLAGS[hand], 0);
+    const poses = new Float32Array(present.length * JOINT_ORDER.length * FIELDS);
+    present.forEach((hand, h) => poses.set(hands[hand], h * JOINT_ORDER.length * FIELDS));
+    this.seq = (this.seq + 1) & 0xffff;
+    if (this.delta && this.key && flags === this.keyFlags &&
+        ((this.seq - this.keySeq) & 0xffff) < KEYFRAME_INTERVAL) {
+      const message = this.encodeDelta(poses, flags);
+      if (message) return message;
+    }
+    return this.encodeKey(poses, flags);
+  }
+
+  private encodeKey(poses: Float32Array, flags: number) {
+    for (let i = 0; i < poses.length; i += FIELDS) {
+      if (poses[i + 6] < 0) for (let k = 3; k < FIELDS; k++) poses[i + k] = -poses[i + k];
+    }
+    const positionScale = Math.max(maxAbs(poses, 0, 3) / 32767, 1e-9);
+    const rotationScale = 1 / 32767;
+    const buffer = new ArrayBuffer(HEADER_SIZE + poses.length * 2);
+    const view = new DataView(buffer);
+    this.writeHeader(view, flags, this.seq, positionScale, rotationScale);
+    this.key = new Float32Array(poses.length);
+    for (let i = 0; i < poses.length; i++) {
+      const scale = i % FIELDS < 3 ? positionScale : rotationScale;
+      const value = Math.round(poses[i] / scale);
+      view.setInt16(HEADER_SIZE + i * 2, value, true);
+      // The decoder's view of the keyframe, so deltas don't drift
+      this.key[i] = value * Math.fround(scale);
+    }
+    this.keySeq = this.seq;
+    this.keyFlags = flags;
+    return buffer;
+  }
+
+  private encodeDelta(poses: Float32Array, flags: number) {
+    const key = this.key!;
+    const diff = new Float32Array(poses.length);
+    for (let i = 0; i < poses.length; i += FIELDS) {
+      let dot = 0;
+      for (let k = 3; k < FIELDS; k++) dot += poses[i + k] * key[i + k];
+      const sign = dot < 0 ? -1 : 1;
+      for (let k = 0; k < FIELDS; k++) {
+        diff[i + k] = (k < 3 ? poses[i + k] : sign * poses[i + k]) - key[i + k];
+      }
+    }
+    const positionScale = Math.max(maxAbs(diff, 0, 3) / 127, 1e-9);
+    const rotationScale = Math.max(maxAbs(diff, 3, 4) / 127, 1e-9);
+    if (positionScale > MAX_DELTA_POSITION_STEP || rotationScale > MAX_DELTA_ROTATION_STEP) {
+      return null;
+    }
+    const buffer = new ArrayBuffer(HEADER_SIZE + diff.length);
+    const view = new DataView(buffer);
+    this.writeHeader(view, flags | FLAG_DELTA, this.keySeq, positionScale, rotationScale);
+    for (let i = 0; i < diff.length; i++) {
+      const scale = i % FIELDS < 3 ? positionScale : rotationScale;
+      view.setInt8(HEADER_SIZE + i, Math.round(diff[i] / scale));
+    }
+    return buffer;
+  }
+
+  private writeHeader(view: DataView, flags: number, keySeq: number,
+                      positionScale: number, rotationScale: number) {
+    view.setUint8(0, POSE_CODEC_VERSION);
+    view.setUint8(1, flags);
+    view.setUint16(2, this.epoch, true);
+    view.setUint16(4, this.seq, true);
+    view.setUint16(6, keySeq, true);
+    view.setFloat32(8, positionScale, true);
+    view.setFloat32(12, rotationScale, true);
+  }
+}
@@ -0,0 +1,63 @@
+import os
+import time
+
+# Elements (and webrtcbin's internal elements) used when a session starts
+PREWARM_FACTORIES = [
+    "webrtcbin", "rtpbin", "nicesrc", "nicesink", "dtlssrtpenc", "dtlssrtpdec",
+    "sctpenc", "sctpdec", "libcamerasrc", "capsfilter", "videoconvert",
+    "videorate", "videoscale", "queue", "vp8enc", "rtpvp8pay", "appsink",
+    "appsrc", "decodebin", "shmsrc", "audiotestsrc", "audioconvert",
+    "audioresample", "opusenc", "rtpopuspay",
+]
+
+
+def boot_time():
+    return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+
+def process_start_time():
+    """CLOCK_BOOTTIME seconds at which this process was launched."""
+    with open("/proc/self/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # starttime is field 22 of /proc/<pid>/stat, counted in clock ticks since boot
+    return int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+
+class StartupProfiler:
+    """Record named startup phases relative to process launch.
+
+    Only the first mark of each name counts, so marks can be left in code
+    paths that run on every session.
+    """
+
+    def __init__(self):
+        self.launch = process_start_time()
+        self.marks = []
+        self.names = set()
+
+    def mark(self, name):
+        if name not in self.names:
+            self.names.add(name)
+            self.marks.append((name, boot_time()))
+
+    def report(self):
+        print("Startup profile (ms since process launch):")
+        last = self.launch
+        for name, t in self.marks:
+            print(f"  {name:24s} +{(t - last) * 1000:8.1f}  {(t - self.launch) * 1000:8.1f}")
+            last = t
+
+
+profiler = StartupProfiler()
+
+
+def prewarm(factories=PREWARM_FACTORIES):
+    """Load the plugins behind `factories` now instead of on the first HELLO."""
+    from gi.repository import Gst
+
+    for name in factories:
+        factory = Gst.ElementFactory.find(name)
+        if factory is None:
+            print(f"Prewarm: no element factory {name}")
+        else:
+            factory.load()
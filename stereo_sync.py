@@ -0,0 +1,174 @@
+import threading
+from collections import deque
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+LEFT, RIGHT = 0, 1
+
+# The two sensors free-run without a shared trigger, so the best achievable
+# pairing is the nearest frame: half a frame interval at 30 fps.
+DEFAULT_TOLERANCE = Gst.SECOND // 60
+
+# Log skew statistics every this many pairs
+STATS_INTERVAL = 300
+
+
+class StereoSynchronizer:
+    """Match left/right frames by capture timestamp.
+
+    Frames are pushed per eye in timestamp order. A head frame that is older
+    than the other eye's head by more than the tolerance can never be paired
+    and is dropped. If one eye stalls for more than max_pending frames, the
+    other eye is paired with a duplicate of the stalled eye's last frame so
+    the output keeps flowing.
+    """
+
+    def __init__(self, on_pair, tolerance=DEFAULT_TOLERANCE, max_pending=3):
+        self.on_pair = on_pair
+        self.tolerance = tolerance
+        self.max_pending = max_pending
+        self.pending = (deque(), deque())
+        self.last = [None, None]
+        self.lock = threading.RLock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.pairs = 0
+        self.dropped = [0, 0]
+        self.duplicated = [0, 0]
+        self.skew_sum = 0
+        self.skew_max = 0
+        self.skew_last = 0
+
+    def push(self, eye, pts, item):
+        with self.lock:
+            self.pending[eye].append((pts, item))
+            self._match()
+
+    def _emit(self, left, right):
+        self.last[LEFT] = left
+        self.last[RIGHT] = right
+        skew = left[0] - right[0]
+        self.pairs += 1
+        self.skew_sum += abs(skew)
+        self.skew_max = max(self.skew_max, abs(skew))
+        self.skew_last = skew
+        self.on_pair(left[1], right[1])
+
+    def _match(self):
+        left, right = self.pending
+        while True:
+            if left and right:
+                skew = left[0][0] - right[0][0]
+                if abs(skew) <= self.tolerance:
+                    self._emit(left.popleft(), right.popleft())
+                elif skew < 0:
+                    left.popleft()
+                    self.dropped[LEFT] += 1
+                else:
+                    right.popleft()
+                    self.dropped[RIGHT] += 1
+            elif len(left) > self.max_pending or len(right) > self.max_pending:
+                eye = LEFT if left else RIGHT
+                other = 1 - eye
+                frame = self.pending[eye].popleft()
+                if self.last[other] is None:
+                    self.dropped[eye] += 1
+                    continue
+                self.duplicated[other] += 1
+                if eye == LEFT:
+                    self._emit(frame, self.last[RIGHT])
+                else:
+                    self._emit(self.last[LEFT], frame)
+            else:
+                return
+
+    def stats(self):
+        """Skew statistics in milliseconds plus drop/duplicate counters."""
+        with self.lock:
+            mean = self.skew_sum / self.pairs if self.pairs else 0
+            return {
+                "pairs": self.pairs,
+                "dropped": list(self.dropped),
+                "duplicated": list(self.duplicated),
+                "skew_mean_ms": mean / Gst.MSECOND,
+                "skew_max_ms": self.skew_max / Gst.MSECOND,
+                "skew_last_ms": self.skew_last / Gst.MSECOND,
+            }
+
+
+def sync_description(i):
+    """Launch description fragment that routes camera i through the synchronizer.
+
+    The appsink ends the capture half of the branch and the appsrc starts
+    the encode half; StereoBridge connects the two.
+    """
+    return (f'appsink name=syncsink{i} emit-signals=true sync=false max-buffers=1 drop=true '
+            f'appsrc name=syncsrc{i} format=time is-live=true block=false')
+
+
+class StereoBridge:
+    """Pair frames from two appsinks and push each matched pair to two appsrcs.
+
+    `process`, if given, maps a Gst.Sample to the Gst.Buffer to push (e.g. the
+    OpenCV undistort step). It runs on each eye's own streaming thread before
+    pairing so both eyes are still processed in parallel. Both buffers of a
+    pair are stamped with the newer of the two PTS, so pairs that repeat a
+    stalled eye's last frame still go out with increasing timestamps.
+    `gate`, if given, is called as gate(pts, left, right) with each matched
+    pair and the pair is dropped if it returns False (motion_gate.MotionGate).
+    """
+
+    def __init__(self, appsinks, appsrcs, process=None, tolerance=DEFAULT_TOLERANCE,
+                 gate=None):
+        self.appsrcs = appsrcs
+        self.process = process
+        self.gate = gate
+        self.caps = [None, None]
+        self.last_pts = None
+        self.sync = StereoSynchronizer(self.push_pair, tolerance)
+        for appsrc in appsrcs:
+            if appsrc.find_property("leaky-type"):
+                # GStreamer >= 1.20: keep at most two frames, dropping the oldest
+                appsrc.set_property("max-buffers", 2)
+                appsrc.set_property("leaky-type", 2)
+        for eye, appsink in enumerate(appsinks):
+            appsink.connect("new-sample", self.on_new_sample, eye)
+
+    def on_new_sample(self, appsink, eye):
+        sample = appsink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        buf = sample.get_buffer()
+        if self.process:
+            out = self.process(sample)
+            if out is None:
+                return Gst.FlowReturn.OK
+            out.pts = buf.pts
+        else:
+            out = buf
+        self.sync.push(eye, buf.pts, (out, sample.get_caps()))
+        return Gst.FlowReturn.OK
+
+    def push_pair(self, left, right):
+        pts = max(left[0].pts, right[0].pts)
+        if self.last_pts is not None and pts <= self.last_pts:
+            pts = self.last_pts + 1
+        self.last_pts = pts
+        if self.gate is None or self.gate(pts, left, right):
+            for eye, (buf, caps) in enumerate((left, right)):
+                appsrc = self.appsrcs[eye]
+                if self.caps[eye] is None or not caps.is_equal(self.caps[eye]):
+                    self.caps[eye] = caps
+                    appsrc.set_property("caps", caps)
+                out = buf.copy()
+                out.pts = pts
+                out.dts = Gst.CLOCK_TIME_NONE
+                appsrc.emit("push-buffer", out)
+        if self.sync.pairs % STATS_INTERVAL == 0:
+            print("Stereo sync:", self.stats())
+
+    def stats(self):
+        return self.sync.stats()
@@ -1,10 +1,8 @@
 import asyncio
 import json
-import ssl
+import threading
 import websockets
-from opencvFix import undistort_gst
 import gi
-import numpy as np
 gi.require_version('Gst', '1.0')
 gi.require_version('GstWebRTC', '1.0')
 gi.require_version('GstSdp', '1.0')
@@ -12,6 +10,8 @@ from gi.repository import Gst, GstWebRTC, GstSdp, GLib
 
 Gst.init(None)
 
+from stereo_sync import StereoBridge
+
 PIPELINE_DESC = '''
 webrtcbin name=sendrecv bundle-policy=max-bundle stun-server=stun://stun.l.google.com:19302
 '''
@@ -22,6 +22,40 @@ VIDEO_SOURCES = [
 ]
 
 AUDIO_SOURCE = "audiotestsrc"
+
+# OpenCV and numpy are only imported when this is on
+UNDISTORT = True
+
+def load_undistort():
+    """Import OpenCV and build the remap tables ahead of the first frame."""
+    from opencvFix import undistort_maps
+    undistort_maps()
+    print("Undistort maps ready")
+
+def undistort_sample(sample):
+    """Undistort a BGR sample with OpenCV and return it as a new Gst.Buffer."""
+    import numpy as np
+    from opencvFix import undistort_gst
+
+    buf = sample.get_buffer()
+    caps = sample.get_caps()
+    height = caps.get_structure(0).get_value("height")
+    width = caps.get_structure(0).get_value("width")
+    # Map buffer
+    success, map_info = buf.map(Gst.MapFlags.READ)
+    if not success:
+        return None
+    frame = np.frombuffer(map_info.data, dtype=np.uint8)
+    frame = frame.reshape((height, width, 3))  # adjust channels if needed
+    buf.unmap(map_info)
+    # Apply your undistort
+    frame = undistort_gst(frame)
+
+    # Create new GstBuffer from processed frame
+    out_buf = Gst.Buffer.new_allocate(None, frame.nbytes, None)
+    out_buf.fill(0, frame.tobytes())
+    return out_buf
+
 async def glib_main_loop_iteration():
     while True:
         # Process all pending GLib events without blocking
@@ -37,6 +71,7 @@ class WebRTCServer:
         self.ws = None  # active client connection
         self.loop = loop
         self.added_data_channel = False
+        self.stereo = None
 
     def start_pipeline(self):
         print("Starting pipeline")
@@ -54,6 +89,7 @@ class WebRTCServer:
         self.webrtc.connect("on-data-channel", self.on_data_channel)
         self.webrtc.connect("pad-added", self.on_incoming_stream)
 
+        appsinks, appsrcs = [], []
         for i, cam_name in enumerate(VIDEO_SOURCES):
             # Source + conversion
             src = Gst.ElementFactory.make("libcamerasrc", f"libcamerasrc{i}")
@@ -74,7 +110,7 @@ class WebRTCServer:
             appsrc = Gst.ElementFactory.make("appsrc", f"appsrc{i}")
             appsrc.set_property("format", Gst.Format.TIME)
             appsrc.set_property("is-live", True)
-            appsrc.set_property("block", True)
+            appsrc.set_property("block", False)
             appsrc_caps = Gst.Caps.from_string("video/x-raw,format=BGR,width=640,height=480,framerate=30/1")
             appsrc.set_property("caps", appsrc_caps)
 
@@ -99,29 +135,8 @@ class WebRTCServer:
             queue.link(vp8enc)
             vp8enc.link(pay)
 
-            # --- Connect appsink to OpenCV processing ---
-            def on_new_sample(sink, appsrc=appsrc):
-                sample = appsink.emit("pull-sample")
-                buf = sample.get_buffer()
-                caps = sample.get_caps()
-                height = caps.get_structure(0).get_value("height")
-                width = caps.get_structure(0).get_value("width")
-                # Map buffer
-                success, map_info = buf.map(Gst.MapFlags.READ)
-                if success:
-                    frame = np.frombuffer(map_info.data, dtype=np.uint8)
-                    frame = frame.reshape((height, width, 3))  # adjust channels if needed
-                    buf.unmap(map_info)
-                    # Apply your undistort
-                    frame = undistort_gst(frame)
-
-                # Create new GstBuffer from processed frame
-                    out_buf = Gst.Buffer.new_allocate(None, frame.nbytes, None)
-                    out_buf.fill(0, frame.tobytes())
-                    appsrc.emit("push-buffer", out_buf)
-                return Gst.FlowReturn.OK
-
-            appsink.connect("new-sample", on_new_sample)
+            appsinks.append(appsink)
+            appsrcs.append(appsrc)
 
             # Add transceiver and link to webrtcbin
             caps = pay.get_static_pad("src").get_current_caps()
@@ -137,6 +152,10 @@ class WebRTCServer:
                 print("Pad link result", ret)
             print(f"Created transceiver {i}: {transceiver}")
 
+        # --- Pair both eyes by capture time, undistorting each on its own thread ---
+        self.stereo = StereoBridge(appsinks, appsrcs,
+                                   process=undistort_sample if UNDISTORT else None)
+
         self.webrtc.connect("on-negotiation-needed", self.on_negotiation_needed)
         self.pipe.set_state(Gst.State.PLAYING)
         print("Pipeline started")
@@ -155,6 +174,7 @@ class WebRTCServer:
             self.pipe.set_state(Gst.State.NULL)
             self.pipe = None
             self.webrtc = None
+            self.stereo = None
 
     def on_message_string(self, channel, message):
         print("Received:", message)
@@ -296,6 +316,9 @@ class WebRTCServer:
 async def main():
     loop = asyncio.get_running_loop()
     server = WebRTCServer(loop)
+    if UNDISTORT:
+        # Warm up OpenCV in the background while waiting for a client
+        threading.Thread(target=load_undistort, daemon=True).start()
     async def handler(websocket):
         await server.websocket_handler(websocket)
     asyncio.create_task(glib_main_loop_iteration())